@@ -1,11 +1,12 @@
 import asyncio
 import logging
 import sys
+from typing import Any, Dict
 
 import disnake
 from disnake.ext import commands
 
-from . import checks, error_handler, types, utils
+from . import checks, error_handler, storage, tracing, types, utils
 from .config import Config
 
 assert sys.version_info[:2] >= (3, 9)
@@ -26,6 +27,15 @@ intents = disnake.Intents.default()
 intents.members = True
 intents.message_content = True
 
+member_cache_kwargs: Dict[str, Any] = {}
+if Config.low_memory_members:
+    # the relevant parts of members (roles, bot flag) are included in message events,
+    # other members are fetched on demand
+    member_cache_kwargs = {
+        "member_cache_flags": disnake.MemberCacheFlags.none(),
+        "chunk_guilds_at_startup": False,
+    }
+
 bot = commands.Bot(
     command_prefix=commands.when_mentioned_or(Config.prefix),
     activity=disnake.Activity(type=disnake.ActivityType.watching, name="Link(s)"),
@@ -34,6 +44,7 @@ bot = commands.Bot(
     command_sync_flags=commands.CommandSyncFlags.all(),
     reload=utils.debugger_active(),
     allowed_mentions=disnake.AllowedMentions.none(),
+    **member_cache_kwargs,
 )
 
 
@@ -95,9 +106,16 @@ bot.application_command_check(slash_commands=True, user_commands=True, message_c
     cmd_filter
 )
 
+# log slow messages
+if Config.slow_message_ms:
+    tracing.add_exporter(tracing.SlowSpanExporter(Config.slow_message_ms))
+
 # initialize global error handler
 error_handler.init(bot)
 error_handler.init_warnings_handler(bot)
 
 # connect
 bot.run(Config.token)
+
+# cogs already flushed any pending writes when unloading on shutdown
+storage.get().close()
@@ -0,0 +1,292 @@
+"""
+Benchmarks for the checkers and the full message check pipeline, using a synthetic
+message corpus, generated lists of realistic sizes, and a stub DNS resolver.
+
+Usage: python -m guardianbot.benchmark [--messages N] [--list-scale X] [--dns-latency-ms X] [--json]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import statistics
+import string
+import tempfile
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from ipaddress import IPv4Network
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Set
+
+from . import offline
+
+# list sizes at scale 1, roughly matching the lists of a large server
+LIST_SIZES = {
+    "allowlist.json": 100,
+    "blocklist.json": 500,
+    "blocklist_regex.json": 200,
+    "blocklist_spam.json": 50,
+    "blocklist_ips.json": 300,
+    "discord_bad_domains.cache": 20000,
+}
+
+# share of each message kind in the corpus
+CORPUS_MIX = {"text": 0.55, "link": 0.25, "embed": 0.1, "spam": 0.1}
+
+
+@dataclass
+class Timings:
+    name: str
+    durations: List[float] = field(default_factory=list)
+    matches: int = 0
+
+    def add(self, duration: float, matched: bool) -> None:
+        self.durations.append(duration)
+        self.matches += matched
+
+    def summary(self) -> Dict[str, Any]:
+        total = sum(self.durations)
+        quantiles = (
+            statistics.quantiles(self.durations, n=100, method="inclusive")
+            if len(self.durations) >= 2
+            else self.durations * 99
+        )
+        return {
+            "name": self.name,
+            "count": len(self.durations),
+            "matches": self.matches,
+            "per_sec": len(self.durations) / total if total else 0,
+            "p50_us": quantiles[49] * 1e6,
+            "p99_us": quantiles[98] * 1e6,
+        }
+
+
+class Corpus:
+    """Generates lists and a deterministic stream of message payloads using them"""
+
+    def __init__(self, seed: int, list_scale: float):
+        self._rng = random.Random(seed)
+        self._sizes = {k: max(1, int(v * list_scale)) for k, v in LIST_SIZES.items()}
+
+        self.vocab = [self._word() for _ in range(2000)]
+        self.keywords = [self._word(8, 12) for _ in range(self._sizes["blocklist.json"])]
+        self.regex_words = [
+            (self._word(6, 9), self._word(6, 9)) for _ in range(self._sizes["blocklist_regex.json"])
+        ]
+        self.spam_words = [
+            (self._word(6, 9), self._word(6, 9)) for _ in range(self._sizes["blocklist_spam.json"])
+        ]
+
+        self.hosts = [
+            f"{self._word(4, 10)}.{self._rng.choice(['com', 'net', 'org', 'io', 'gg'])}"
+            for _ in range(1000)
+        ]
+        self.allowed_hosts = self.hosts[: self._sizes["allowlist.json"]]
+        # a few bad domains actually show up in messages, the rest are just there for size
+        self.bad_hosts = [f"{self._word(6, 10)}-gift.com" for _ in range(50)]
+        self.authors = [str(10**17 + i) for i in range(500)]
+        self.channels = [str(2 * 10**17 + i) for i in range(20)]
+
+    def _word(self, min_len: int = 3, max_len: int = 8) -> str:
+        return "".join(
+            self._rng.choices(string.ascii_lowercase, k=self._rng.randint(min_len, max_len))
+        )
+
+    def write_lists(self, data_dir: Path) -> None:
+        ips: Set[str] = {
+            # make sure some of the hosts in the corpus actually resolve to blocked IPs
+            f"{offline.StubResolver.address(h)}/32"
+            for h in self._rng.sample(self.hosts[len(self.allowed_hosts) :], 5)
+        }
+        while len(ips) < self._sizes["blocklist_ips.json"]:
+            prefix = self._rng.choices([24, 28, 32], [1, 2, 7])[0]
+            ips.add(str(IPv4Network((10 << 24 | self._rng.getrandbits(24), prefix), strict=False)))
+
+        bad_domains = [
+            hashlib.sha256(h.encode()).hexdigest()
+            for h in (
+                *self.bad_hosts,
+                *(
+                    f"{self._word(6, 14)}.com"
+                    for _ in range(self._sizes["discord_bad_domains.cache"] - len(self.bad_hosts))
+                ),
+            )
+        ]
+
+        lists = {
+            "allowlist.json": self.allowed_hosts,
+            "blocklist.json": self.keywords,
+            "blocklist_regex.json": [rf"\b{a}\s+{b}\b" for a, b in self.regex_words],
+            "blocklist_spam.json": [rf"\b{a}\W+{b}\b" for a, b in self.spam_words],
+            "blocklist_ips.json": sorted(ips),
+            "discord_bad_domains.cache": bad_domains,
+        }
+        for name, entries in lists.items():
+            (data_dir / name).write_text(json.dumps(entries))
+
+    def _text(self, min_words: int = 3, max_words: int = 30) -> str:
+        words = self._rng.choices(self.vocab, k=self._rng.randint(min_words, max_words))
+        # occasionally include a blocked keyword/phrase
+        r = self._rng.random()
+        if r < 0.01:
+            words.insert(self._rng.randrange(len(words) + 1), self._rng.choice(self.keywords))
+        elif r < 0.02:
+            words.insert(
+                self._rng.randrange(len(words) + 1), " ".join(self._rng.choice(self.regex_words))
+            )
+        return " ".join(words)
+
+    def _url(self) -> str:
+        r = self._rng.random()
+        host = self._rng.choice(self.bad_hosts if r < 0.02 else self.hosts)
+        path = "/".join(self._rng.choices(self.vocab, k=self._rng.randint(0, 3)))
+        return f"https://{host}/{path}"
+
+    def _link_text(self) -> str:
+        parts = [self._text(0, 10)]
+        parts.extend(self._url() for _ in range(self._rng.randint(1, 3)))
+        parts.append(self._text(0, 10))
+        return " ".join(parts)
+
+    def messages(self, count: int) -> Iterator[Dict[str, Any]]:
+        now = datetime.now(timezone.utc)
+        kinds = list(CORPUS_MIX.keys())
+        weights = list(CORPUS_MIX.values())
+
+        n = 0
+        while n < count:
+            now += timedelta(milliseconds=self._rng.randint(10, 500))
+            author = self._rng.choice(self.authors)
+            kind = self._rng.choices(kinds, weights)[0]
+
+            payloads: List[Dict[str, Any]] = []
+            if kind == "text":
+                payloads.append({"content": self._text()})
+            elif kind == "link":
+                payloads.append({"content": self._link_text()})
+            elif kind == "embed":
+                payloads.append(
+                    {
+                        "content": self._text(0, 5),
+                        "embeds": [
+                            {
+                                "title": self._text(1, 6),
+                                "description": self._link_text(),
+                                "fields": [
+                                    {"name": self._text(1, 2), "value": self._text(1, 10)}
+                                    for _ in range(self._rng.randint(0, 3))
+                                ],
+                            }
+                        ],
+                    }
+                )
+            else:
+                # the same message repeated a few times in quick succession
+                a, b = self._rng.choice(self.spam_words)
+                content = f"{self._text(0, 5)} {a} {b} {self._url()}"
+                payloads.extend({"content": content} for _ in range(self._rng.randint(2, 5)))
+
+            for payload in payloads[: count - n]:
+                now += timedelta(milliseconds=self._rng.randint(10, 300))
+                payload.update(
+                    author={"id": author, "username": f"user{author[-3:]}"},
+                    channel_id=self._rng.choice(self.channels),
+                    timestamp=now.isoformat(),
+                )
+                yield payload
+                n += 1
+
+
+async def _measure(timings: Timings, func: Callable[[], Awaitable[Any]]) -> None:
+    start = time.perf_counter()
+    result = await func()
+    timings.add(time.perf_counter() - start, bool(result))
+
+
+async def run(args: argparse.Namespace, data_dir: Path) -> List[Dict[str, Any]]:
+    from .config import Config
+    from .filter import CheckContext
+
+    corpus = Corpus(args.seed, args.list_scale)
+    corpus.write_lists(data_dir)
+
+    guild = offline.OfflineGuild(Config.guild_id)
+    resolver = offline.StubResolver(latency=args.dns_latency_ms / 1000)
+    messages = [guild.message(p) for p in corpus.messages(args.messages)]
+
+    # individual checkers
+    cog, _ = offline.load_filter_cog(guild, resolver=resolver)
+    from_message = Timings("CheckContext.from_message")
+    checker_timings = {
+        name: Timings(f"{type(c).__name__} ({name})")
+        for name, c in cog.checkers.items()
+        if c is not cog.allowlist
+    }
+    for message in messages:
+        start = time.perf_counter()
+        context = CheckContext.from_message(
+            message, parent=message, is_host_allowed=cog._is_host_allowed
+        )
+        from_message.add(time.perf_counter() - start, False)
+
+        for name, timings in checker_timings.items():
+            checker = cog.checkers[name]
+            await _measure(timings, lambda: checker.check_match(context))
+
+    # full pipeline, using a new cog to start with empty caches
+    cog, _ = offline.load_filter_cog(guild, resolver=resolver)
+    pipeline = Timings("FilterCog.check_message")
+    for message in messages:
+        await _measure(pipeline, lambda: cog.check_message(message, parent=message))
+
+    return [t.summary() for t in (from_message, *checker_timings.values(), pipeline)]
+
+
+def _print_table(results: List[Dict[str, Any]]) -> None:
+    header = (
+        f"{'benchmark':<40} {'count':>8} {'matches':>8} {'msg/s':>12}"
+        f" {'p50 (us)':>10} {'p99 (us)':>10}"
+    )
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{r['name']:<40} {r['count']:>8} {r['matches']:>8} {r['per_sec']:>12.0f}"
+            f" {r['p50_us']:>10.1f} {r['p99_us']:>10.1f}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m guardianbot.benchmark",
+        # first paragraph of the module docstring; argparse reflows the line breaks
+        description=__doc__.strip().split("\n\n")[0],
+    )
+    parser.add_argument("--messages", type=int, default=10000, help="number of messages")
+    parser.add_argument(
+        "--list-scale", type=float, default=1, help="multiplier for the default list sizes"
+    )
+    parser.add_argument(
+        "--dns-latency-ms", type=float, default=0, help="simulated latency of DNS lookups"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="seed for the corpus generator")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    with tempfile.TemporaryDirectory(prefix="guardianbot-bench-") as tmp:
+        data_dir = Path(tmp)
+        offline.configure(str(data_dir))
+        results = asyncio.run(run(args, data_dir))
+
+    if args.json:
+        print(json.dumps(results, indent=4))
+    else:
+        _print_table(results)
+
+
+if __name__ == "__main__":
+    main()
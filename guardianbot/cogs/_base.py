@@ -1,11 +1,12 @@
 import functools
+import json
 import logging
-from pathlib import Path
 from typing import (
     TYPE_CHECKING,
     Any,
     Callable,
     Coroutine,
+    Dict,
     Generic,
     Optional,
     Type,
@@ -18,7 +19,7 @@ import aiohttp
 import disnake
 from disnake.ext import commands, tasks
 
-from .. import error_handler, multicmd, types, utils
+from .. import error_handler, multicmd, persistence, storage, types, utils
 from ..config import Config
 
 logger = logging.getLogger(__name__)
@@ -35,7 +36,8 @@ class BaseCog(Generic[_TState], commands.Cog, metaclass=multicmd._MultiCmdMeta):
     def __init__(self, bot: types.Bot):
         self._bot = bot
 
-        self._state_path = Path(Config.data_dir) / "state" / f"{type(self).__name__.lower()}.json"
+        self._state_name = type(self).__name__.lower()
+        self._storage = storage.get()
         # get `_TState` at runtime
         state_type = get_args(type(self).__orig_bases__[0])[0]  # type: ignore
         if state_type is type(None):  # noqa: E721
@@ -46,6 +48,12 @@ class BaseCog(Generic[_TState], commands.Cog, metaclass=multicmd._MultiCmdMeta):
             ), f"state type must inherit from `StrictModel` (got '{state_type}')"
         self.__state_type: Optional[Type[utils.StrictModel]] = state_type
 
+        self._state_writer = persistence.DebouncedWriter(
+            f"state/{self._state_name}",
+            lambda: cast(utils.StrictModel, self.state).json(indent=4),
+            functools.partial(self._storage.save_state, self._state_name),
+        )
+
         self._read_state()
 
     def _read_state(self) -> None:
@@ -53,19 +61,30 @@ class BaseCog(Generic[_TState], commands.Cog, metaclass=multicmd._MultiCmdMeta):
             self.state = None  # type: ignore
             return
 
-        if self._state_path.exists():
-            state = self.__state_type.parse_file(self._state_path)
+        if (raw := self._storage.load_state(self._state_name)) is not None:
+            data: Dict[str, Any] = json.loads(raw)
+            self._migrate_state(data)
+            state = self.__state_type.parse_obj(data)
         else:
             state = self.__state_type()
         self.state = cast(_TState, state)  # see `_TState` comment above
         self._write_state()
 
+    # override in subclasses
+    def _migrate_state(self, data: Dict[str, Any]) -> None:
+        """Updates the raw state data in-place, if it was stored in an older format"""
+        pass
+
     def _write_state(self) -> None:
         if self.__state_type is None:
             return
 
-        self._state_path.parent.mkdir(parents=True, exist_ok=True)
-        self._state_path.write_text(cast(utils.StrictModel, self.state).json(indent=4))
+        # the actual write happens asynchronously, bursts of changes are coalesced
+        self._state_writer.schedule()
+
+    def cog_unload(self) -> None:
+        # make sure pending changes aren't lost
+        self._state_writer.flush_sync()
 
     # checks
 
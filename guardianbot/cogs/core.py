@@ -1,27 +1,94 @@
 import ast
+import functools
 import inspect
+import io
 import logging
 import sys
+import time
 import traceback
+import tracemalloc
 from datetime import datetime
-from typing import Any, List, Optional, Union
+from typing import Any, List, Optional, Tuple, Union, cast
 
 import disnake
 import humanize
 from disnake.ext import commands
 
-from .. import checks, multicmd, types, utils
+from .. import checks, error_handler, loop_monitor, memory, metrics, multicmd, types, utils
 from ..config import Config
 from ._base import BaseCog
 
 logger = logging.getLogger(__name__)
 
 
+_attr_close_hooked = "_guardianbot_close_hooked"
+_attr_metrics_stop_task = "_guardianbot_metrics_stop_task"
+
+
+def _hook_close(bot: types.Bot) -> None:
+    """
+    `cog_unload` can't be async, and is called from the bot's `close` during shutdown;
+    stop the metrics server before that instead, while the loop is still guaranteed to run.
+    Only installed once, the current cog instance is looked up when closing.
+    """
+    if getattr(bot, _attr_close_hooked, False):
+        return
+    orig_close = bot.close
+
+    async def close() -> None:
+        if (cog := bot.get_cog("CoreCog")) is not None:
+            await cast(CoreCog, cog)._stop_metrics_server()
+        await orig_close()
+
+    bot.close = close  # type: ignore
+    setattr(bot, _attr_close_hooked, True)
+
+
 class CoreCog(BaseCog[None]):
     _start_time: Optional[datetime] = None
+    _metrics_server: Optional[metrics.MetricsServer] = None
+
+    def __init__(self, bot: types.Bot):
+        super().__init__(bot)
+
+        self._loop_monitor = loop_monitor.LoopMonitor(
+            threshold=Config.loop_lag_threshold_ms / 1000,
+            on_blocked=functools.partial(error_handler.handle_task_error, self._bot),
+        )
+        metrics.Gauge(
+            "guardianbot_loop_lag_seconds",
+            "Event loop scheduling delay over the last few minutes",
+            lambda: {
+                (str(q),): v for q, v in self._loop_monitor.percentiles(0.5, 0.9, 0.99, 1).items()
+            },
+            ["quantile"],
+        )
 
     async def cog_load(self) -> None:
         self._start_time = utils.utcnow()
+        self._loop_monitor.start()
+
+        if Config.metrics_port:
+            # wait for the previous instance's server to stop, if the cog was reloaded
+            if stop_task := getattr(self._bot, _attr_metrics_stop_task, None):
+                await stop_task
+            self._metrics_server = metrics.MetricsServer(Config.metrics_host, Config.metrics_port)
+            await self._metrics_server.start()
+            _hook_close(self._bot)
+
+    def cog_unload(self) -> None:
+        self._loop_monitor.stop()
+        if self._metrics_server:
+            # only reached if the cog gets unloaded without closing the bot;
+            # keep a reference to the task, otherwise it may be garbage-collected
+            task = self._bot.loop.create_task(self._stop_metrics_server())
+            setattr(self._bot, _attr_metrics_stop_task, task)
+        super().cog_unload()
+
+    async def _stop_metrics_server(self) -> None:
+        if server := self._metrics_server:
+            self._metrics_server = None
+            await server.stop()
 
     @multicmd.command(description="Shows information about the bot")
     async def info(self, ctx: types.AnyContext) -> None:
@@ -45,6 +112,10 @@ class CoreCog(BaseCog[None]):
             inline=False,
         )
         embed.add_field(name="Ping", value=f"{int(self._bot.latency * 1000)}ms", inline=False)
+        lag = self._loop_monitor.percentiles(0.5, 0.99)
+        embed.add_field(
+            name="Loop lag", value=f"p50: {lag[0.5] * 1000:.1f}ms, p99: {lag[0.99] * 1000:.1f}ms"
+        )
 
         await ctx.send(embed=embed)
 
@@ -102,6 +173,105 @@ class CoreCog(BaseCog[None]):
         time = disnake.utils.snowflake_time(int(snowflake))
         await ctx.send(str(time))
 
+    @commands.command(hidden=True)
+    @commands.is_owner()
+    async def sync(self, ctx: types.Context) -> None:
+        """
+        Overwrites all application commands with the local ones, regardless of the cached state;
+        repairs commands that were deleted or edited outside of the bot
+        """
+        global_cmds, guild_cmds = self._bot._ordered_unsynced_commands(self._bot._test_guilds)
+        # the responses replace the cached commands
+        await self._bot.bulk_overwrite_global_commands(global_cmds)
+        for guild_id, cmds in guild_cmds.items():
+            await self._bot.bulk_overwrite_guild_commands(guild_id, cmds)
+        count = len(global_cmds) + sum(map(len, guild_cmds.values()))
+        await ctx.send(f"Synced {count} application command(s)")
+
+    @commands.group(hidden=True, invoke_without_command=True)
+    @commands.is_owner()
+    async def memory(self, ctx: types.Context) -> None:
+        """Shows the approximate memory usage of caches and other large data structures"""
+        state = self._bot._connection
+        items: List[Tuple[str, Any]] = [
+            ("disnake.users", state._users),
+            ("disnake.messages", state._messages),
+            *(
+                (f"disnake.guild.{attr}", getattr(guild, attr))
+                for guild in self._bot.guilds
+                for attr in ("_members", "_channels", "_threads", "_roles")
+            ),
+        ]
+        for cog_name, cog in self._bot.cogs.items():
+            if callable(usage := getattr(cog, "memory_usage", None)):
+                items.extend((f"{cog_name}.{k}", v) for k, v in usage().items())
+
+        # shared objects are excluded, so they aren't attributed to every cache referencing them
+        start = time.perf_counter()
+        infos = await memory.measure(
+            items,
+            exclude=[self._bot, state, self._bot.http, *self._bot.guilds, *self._bot.cogs.values()],
+        )
+        elapsed = time.perf_counter() - start
+
+        width = max(len(i.name) for i in infos)
+        lines = [
+            f"{i.name:<{width}}  {i.count if i.count is not None else '-':>8}  "
+            f"{humanize.naturalsize(i.size, binary=True):>10}{'+' if i.truncated else ''}"
+            for i in infos
+        ]
+        rss = memory.process_rss()
+        lines.append("")
+        lines.append(f"RSS: {humanize.naturalsize(rss, binary=True) if rss else '-'}")
+        lines.append(f"GC objects: {memory.gc_object_count()}")
+        lines.append(f"(measured in {elapsed * 1000:.0f}ms)")
+
+        text = "\n".join(lines)
+        if len(text) > 1900:
+            await ctx.send(file=disnake.File(io.BytesIO(text.encode()), "memory.txt"))
+        else:
+            await ctx.send(f"```\n{text}\n```")
+
+    @memory.command(name="trace")
+    async def memory_trace(self, ctx: types.Context, enable: bool, frames: int = 1) -> None:
+        """Starts/stops tracing allocations using tracemalloc (slows down everything)"""
+        if enable:
+            memory.start_tracing(frames)
+            await ctx.send(f"Started tracing allocations ({frames} frame(s))")
+        else:
+            memory.stop_tracing()
+            await ctx.send("Stopped tracing allocations")
+
+    @memory.command(name="snapshot")
+    async def memory_snapshot(self, ctx: types.Context, limit: int = 15) -> None:
+        """Shows the top allocations, and stores the snapshot for the next diff"""
+        if not tracemalloc.is_tracing():
+            await ctx.send("Not tracing allocations, use `memory trace on` first")
+            return
+        snapshot = await utils.run_in_executor(memory.take_snapshot)
+        lines = await utils.run_in_executor(memory.top_allocations, snapshot, limit)
+        await self._send_lines(ctx, "Top allocations", lines, "snapshot.txt")
+
+    @memory.command(name="diff")
+    async def memory_diff(self, ctx: types.Context, limit: int = 15) -> None:
+        """Shows the largest differences since the previous snapshot, and stores a new one"""
+        if not tracemalloc.is_tracing():
+            await ctx.send("Not tracing allocations, use `memory trace on` first")
+            return
+        lines = await utils.run_in_executor(memory.diff_allocations, limit)
+        if lines is None:
+            await ctx.send("No previous snapshot, took a new one")
+            return
+        await self._send_lines(ctx, "Differences since the previous snapshot", lines, "diff.txt")
+
+    @staticmethod
+    async def _send_lines(ctx: types.Context, title: str, lines: List[str], filename: str) -> None:
+        text = "\n".join(lines)
+        if len(text) > 1900:
+            await ctx.send(f"{title}:", file=disnake.File(io.BytesIO(text.encode()), filename))
+        else:
+            await ctx.send(f"{title}:\n```\n{text}\n```")
+
     @commands.command(hidden=True, enabled=Config.enable_owner_eval)
     @commands.is_owner()
     async def eval(self, ctx: types.Context, *, code: str) -> None:
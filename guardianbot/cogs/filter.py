@@ -1,15 +1,20 @@
 import asyncio
+import collections
+import functools
+import hashlib
 import io
 import json
 import logging
-from datetime import datetime, timedelta
+from datetime import timedelta
 from typing import (
     Any,
     Awaitable,
     Callable,
+    Collection,
     Coroutine,
     Dict,
     List,
+    Literal,
     Optional,
     Set,
     Tuple,
@@ -21,22 +26,37 @@ from typing import (
 import disnake
 from disnake.ext import commands
 
-from .. import checks, error_handler, multicmd, types, utils
+from .. import (
+    checks,
+    error_handler,
+    members,
+    metrics,
+    multicmd,
+    mutes,
+    recent,
+    tracing,
+    types,
+    utils,
+)
 from ..config import Config
 from ..filter import (
     AllowList,
     AnyMessageList,
     BaseChecker,
     CheckContext,
+    CheckResult,
     DiscordBadDomainsChecker,
     ExternalBaseChecker,
     IPChecker,
     ListChecker,
+    ListWatcher,
     ManualBaseChecker,
     RegexChecker,
     SpamChecker,
     SpamCheckerConfig,
+    normalize,
 )
+from ..storage import BlockEvent, JsonStorage, SqliteStorage
 from ._base import BaseCog, loop_error_handled
 
 logger = logging.getLogger(__name__)
@@ -52,7 +72,49 @@ MESSAGE_TYPES = frozenset(
 )
 
 
+checker_duration = metrics.Histogram(
+    "guardianbot_checker_duration_seconds", "Time spent per message in each checker", ["checker"]
+)
+checker_matches = metrics.Counter(
+    "guardianbot_checker_matches_total", "Number of matches of each checker", ["checker"]
+)
+checker_timeouts = metrics.Counter(
+    "guardianbot_checker_timeouts_total", "Number of timeouts of each checker", ["checker"]
+)
+messages_total = metrics.Counter(
+    "guardianbot_messages_total", "Number of checked/ignored messages", ["result", "reason"]
+)
+edits_total = metrics.Counter(
+    "guardianbot_edits_total",
+    "Number of edited messages, by whether they were checked again",
+    ["result"],
+)
+shadow_dropped = metrics.Counter(
+    "guardianbot_shadow_dropped_total",
+    "Number of messages not evaluated against shadow entries due to a full queue",
+)
+moderation_duration = metrics.Histogram(
+    "guardianbot_moderation_api_duration_seconds",
+    "Latency of API calls when blocking messages",
+    ["action"],
+)
+
+_T = TypeVar("_T")
 _TChecker = TypeVar("_TChecker", bound=BaseChecker)
+_TIMEOUT = object()
+
+# maximum number of messages waiting to be evaluated against shadow entries
+SHADOW_QUEUE_SIZE = 1000
+# number of recently checked messages to remember the content digest/hosts of, for edits
+EDIT_CACHE_SIZE = 10000
+# number and maximum age of recently checked messages to scan again when entries are added
+RECENT_MESSAGES = 2000
+RECENT_MESSAGES_MINUTES = 15
+
+
+async def _timed(action: str, aw: Awaitable[_T]) -> _T:
+    with tracing.span(action), moderation_duration.time(action=action):
+        return await aw
 
 
 def convert_checker(
@@ -86,11 +148,29 @@ def get_checker_param(type: Type[BaseChecker]) -> Any:
     return commands.Param(autocomp=autocomp_checker(type), converter=convert_checker(type))
 
 
+def parse_entries(data: bytes, filename: str) -> List[str]:
+    """
+    Parses list entries from an uploaded file, either a JSON list of strings,
+    or plain text with one entry per line (empty lines and `#` comments are skipped)
+    """
+    text = data.decode("utf-8-sig")
+    if filename.lower().endswith(".json") or text.lstrip().startswith("["):
+        entries = json.loads(text)
+        if not isinstance(entries, list) or not all(isinstance(e, str) for e in entries):
+            raise ValueError("expected a JSON list of strings")
+        return cast(List[str], entries)
+
+    return [
+        line for line in (s.strip() for s in text.splitlines()) if line and not line.startswith("#")
+    ]
+
+
 class State(utils.StrictModel):
     report_channel: Optional[int] = None
     mute_minutes: int = 10
     unfiltered_roles: Set[int] = set()
     spam_checker_config: SpamCheckerConfig = SpamCheckerConfig()
+    normalized_lists: Set[str] = set()
 
 
 class FilterCog(
@@ -109,19 +189,152 @@ class FilterCog(
             "spam_regex": SpamChecker(self.state.spam_checker_config),
             "ips": IPChecker(),
         }
+        self._apply_normalized_lists()
+
+        spam_checker = self.get_checkers(SpamChecker)["spam_regex"]
+        ip_checker = self.get_checkers(IPChecker)["ips"]
+        metrics.Gauge(
+            "guardianbot_spam_history_size",
+            "Number of messages in the spam history",
+            lambda: sum(map(len, spam_checker.history.values())),
+        )
+        metrics.Gauge(
+            "guardianbot_dns_cache_size",
+            "Number of cached DNS results",
+            lambda: len(ip_checker._cache),
+        )
+
+        # pick up changes to list files made outside of the bot
+        self._watcher = (
+            ListWatcher(
+                self.checkers.values(),
+                on_error=functools.partial(error_handler.handle_task_error, self._bot),
+            )
+            if isinstance(self._storage, JsonStorage)
+            else None
+        )
+
+        # shadow entries are evaluated in the background, separately from the actual checks
+        self._shadow_queue: "asyncio.Queue[CheckContext]" = asyncio.Queue(SHADOW_QUEUE_SIZE)
+        self._shadow_task: Optional["asyncio.Task[None]"] = None
+
+        # references to the most recent messages of each author, for purging
+        self.recent_by_author = recent.RecentMessages()
+
+        # contexts of recently checked (and not blocked) messages, oldest first
+        self._recent: "collections.deque[CheckContext]" = collections.deque(maxlen=RECENT_MESSAGES)
+        self._rescan_tasks: Set["asyncio.Task[None]"] = set()
+
+        # message ID -> (digest of content, hosts) of recently checked messages
+        self._checked: "collections.OrderedDict[int, Tuple[bytes, Tuple[str, ...]]]" = (
+            collections.OrderedDict()
+        )
+
+        self.muted_members = mutes.MutedRegistry(Config.muted_role_id)
+        self._muted_members_task: Optional["asyncio.Task[None]"] = None
+        # members that aren't in disnake's cache (in low-memory mode)
+        self.members = members.MemberCache(lambda: self._guild)
+        metrics.Gauge(
+            "guardianbot_muted_members",
+            "Number of currently muted members",
+            lambda: len(self.muted_members),
+        )
 
     def get_checkers(self, type: Type[_TChecker]) -> Dict[str, _TChecker]:
         return {k: c for k, c in self.checkers.items() if isinstance(c, type)}
 
+    def _text_checkers(self) -> Dict[str, ManualBaseChecker]:
+        return {
+            k: c for k, c in self.checkers.items() if isinstance(c, (ListChecker, RegexChecker))
+        }
+
+    def _apply_normalized_lists(self) -> None:
+        for name, checker in self._text_checkers().items():
+            checker.match_normalized = name in self.state.normalized_lists
+
+    def memory_usage(self) -> Dict[str, Any]:
+        usage: Dict[str, Any] = {
+            f"{name}.{key}": obj
+            for name, checker in self.checkers.items()
+            for key, obj in checker.memory_usage().items()
+        }
+        usage["shadow_queue"] = self._shadow_queue._queue  # type: ignore
+        usage["checked_messages"] = self._checked
+        usage["recent_messages"] = self._recent
+        usage["recent_by_author"] = self.recent_by_author._authors
+        usage["fetched_members"] = self.members._members
+        return usage
+
     @commands.Cog.listener()
     async def on_ready(self) -> None:
         logger.debug("starting tasks")
         if not self._update_checkers.is_running():
             self._update_checkers.start()
 
+        if not Config.low_memory_members:
+            # members may have changed while disconnected
+            self.muted_members.rebuild(self._guild.members)
+        elif self._muted_members_task is None:
+            # member cache is empty, fetch all members once instead; updates are tracked afterwards
+            self._muted_members_task = asyncio.create_task(self._fetch_muted_members())
+
+    async def _fetch_muted_members(self) -> None:
+        # fill the live registry, (un)mutes may happen while fetching and must not get lost
+        registry = self.muted_members
+        registry.start_fill()
+        try:
+            count = 0
+            async for member in self._guild.fetch_members(limit=None):
+                registry.fill(member)
+                count += 1
+            logger.info(f"fetched {count} members, {len(registry)} muted")
+        except Exception as e:
+            await error_handler.handle_task_error(self._bot, e)
+        finally:
+            registry.end_fill()
+
+    @commands.Cog.listener()
+    async def on_raw_member_update(self, member: disnake.Member) -> None:
+        # unlike `on_member_update`, this is also dispatched for uncached members
+        if member.guild.id == Config.guild_id:
+            self.muted_members.update(member)
+            self.members.update(member)
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member: disnake.Member) -> None:
+        if member.guild.id == Config.guild_id:
+            self.muted_members.update(member)
+
+    @commands.Cog.listener()
+    async def on_raw_member_remove(self, payload: disnake.RawGuildMemberRemoveEvent) -> None:
+        if payload.guild_id == Config.guild_id:
+            self.muted_members.remove(payload.user.id)
+            self.members.remove(payload.user.id)
+
+    async def cog_load(self) -> None:
+        if self._watcher:
+            self._watcher.start()
+        self._shadow_task = asyncio.create_task(self._evaluate_shadow())
+        if self.state.normalized_lists:
+            # build translation table in advance, instead of on the first message;
+            # otherwise it's built once the first list is configured to use it
+            await utils.run_in_executor(normalize.build_table)
+
     def cog_unload(self) -> None:
         logger.debug("stopping tasks")
         self._update_checkers.stop()
+        if self._watcher:
+            self._watcher.stop()
+        if self._shadow_task:
+            self._shadow_task.cancel()
+        for task in self._rescan_tasks:
+            task.cancel()
+        if self._muted_members_task:
+            self._muted_members_task.cancel()
+
+        for checker in self.checkers.values():
+            checker.flush_sync()
+        super().cog_unload()
 
     async def cog_any_check(self, ctx: types.AnyContext) -> bool:
         return await checks.manage_messages(ctx)
@@ -137,7 +350,19 @@ class FilterCog(
 
     @commands.Cog.listener()
     async def on_message(self, message: disnake.Message) -> None:
-        check, check_reason = await self._should_check(message)
+        with tracing.span("message", message_id=message.id):
+            await self._on_message(message)
+
+    async def _on_message(self, message: disnake.Message) -> None:
+        if message.guild and message.guild.id == Config.guild_id:
+            self.recent_by_author.add(message.author.id, message.channel.id, message.id)
+
+        with tracing.span("should_check"):
+            check, check_reason = await self._should_check(message)
+        # strip details like IDs from the reason, to keep the number of label values low
+        messages_total.inc(
+            result="checked" if check else "ignored", reason=check_reason.partition(" (")[0]
+        )
         if not check:
             author = (
                 message.interaction_metadata
@@ -147,30 +372,202 @@ class FilterCog(
             logger.info(f"ignoring message {message.id} by {author} ({check_reason})")
             return
 
-        blocked = await self.check_message(message, parent=message)
+        with tracing.span("check_message"):
+            blocked = await self.check_message(message, parent=message)
 
         if not blocked:
             # recurse for message snapshots, which are considered to be basically the same as
             # the current message (in terms of id/author), but with different content/embeds/...
             for snapshot in message.message_snapshots:
-                await self.check_message(snapshot, parent=message)
+                with tracing.span("check_message", snapshot=True):
+                    await self.check_message(snapshot, parent=message)
 
-    async def check_message(self, message: types.AnyMessage, *, parent: disnake.Message) -> bool:
-        context = CheckContext.from_message(message, parent=parent)
-        for checker in self.checkers.values():
-            if checker is self.allowlist:
+    @commands.Cog.listener()
+    async def on_raw_message_edit(self, payload: disnake.RawMessageUpdateEvent) -> None:
+        if payload.guild_id != Config.guild_id:
+            return
+        # skip partial updates without content, e.g. only embeds being resolved
+        if "content" not in payload.data or "author" not in payload.data:
+            return
+        if not (channel := self._guild.get_channel_or_thread(payload.channel_id)):
+            return
+
+        message = disnake.Message(
+            state=self._bot._connection,
+            channel=channel,  # type: ignore
+            data=payload.data,  # type: ignore
+        )
+        with tracing.span("message_edit", message_id=message.id):
+            await self._on_message_edit(message)
+
+    async def _on_message_edit(self, message: disnake.Message) -> None:
+        check, check_reason = await self._should_check(message)
+        if not check:
+            edits_total.inc(result="ignored")
+            logger.debug(f"ignoring edit of message {message.id} ({check_reason})")
+            return
+
+        if (author := await self._get_author(message)) is None:
+            edits_total.inc(result="ignored")
+            logger.debug(f"ignoring edit of message {message.id} (unknown member)")
+            return
+        context = CheckContext.from_message(
+            message, parent=message, author=author, is_host_allowed=self._is_host_allowed
+        )
+        # spam detection counts repeated messages, an edit is still the same message
+        skip: Set[str] = {n for n, c in self.checkers.items() if isinstance(c, SpamChecker)}
+        if previous := self._checked.get(message.id):
+            digest, hosts = previous
+            if digest == self._digest(context):
+                edits_total.inc(result="unchanged")
+                return
+            if hosts == context.hosts:
+                # only the text changed, no need to run hashing/DNS lookups again
+                skip |= {n for n, c in self.checkers.items() if c.host_based}
+
+        edits_total.inc(result="checked")
+        logger.debug(f"checking edited message {message.id}")
+        await self.check_message(message, parent=message, context=context, skip=skip, is_edit=True)
+
+    @staticmethod
+    def _digest(context: CheckContext) -> bytes:
+        # not using the normalized text here, that requires building the translation table
+        return hashlib.blake2b(context.string.encode(), digest_size=16).digest()
+
+    async def check_message(
+        self,
+        message: types.AnyMessage,
+        *,
+        parent: disnake.Message,
+        context: Optional[CheckContext] = None,
+        skip: Collection[str] = (),
+        is_edit: bool = False,
+    ) -> bool:
+        if context is None:
+            if (author := await self._get_author(parent)) is None:
+                logger.debug(f"not checking message {message.id} (unknown member)")
+                return False
+            with tracing.span("from_message"):
+                context = CheckContext.from_message(
+                    message, parent=parent, author=author, is_host_allowed=self._is_host_allowed
+                )
+        if not context.is_forwarded:
+            # remember content, to be able to skip unchanged edits later
+            self._checked[parent.id] = (self._digest(context), context.hosts)
+            self._checked.move_to_end(parent.id)
+            if len(self._checked) > EDIT_CACHE_SIZE:
+                self._checked.popitem(last=False)
+
+        # edited messages were already evaluated, they'd be counted twice otherwise
+        if not is_edit and any(c.shadow for c in self.get_checkers(ManualBaseChecker).values()):
+            try:
+                self._shadow_queue.put_nowait(context)
+            except asyncio.QueueFull:
+                shadow_dropped.inc()
+
+        for name, checker in self.checkers.items():
+            if checker is self.allowlist or name in skip:
                 continue
 
-            if result := await utils.wait_timeout(
-                checker.check_match(context), 5, None  # 5 second timeout
-            ):
-                if result.host and result.host in self.allowlist:
-                    logger.info(f"preventing block, host '{result.host}' is allowed explicitly")
-                    continue
-                await self._handle_blocked(context, result.reason, result.messages or [parent])
+            with tracing.span(f"checker.{name}") as span, checker_duration.time(checker=name):
+                result = await utils.wait_timeout(
+                    checker.check_match(context), 5, _TIMEOUT  # 5 second timeout
+                )
+                span.set(result="timeout" if result is _TIMEOUT else bool(result))
+            if result is _TIMEOUT:
+                logger.warning(f"checker '{name}' timed out on message {context.message.id}")
+                checker_timeouts.inc(checker=name)
+            elif isinstance(result, CheckResult):
+                checker_matches.inc(checker=name)
+                if result.entry is not None:
+                    checker.hits.record(result.entry)
+                with tracing.span("handle_blocked"):
+                    await self._handle_blocked(context, name, result)
                 return True
+
+        self._recent.append(context)
         return False
 
+    def _rescan_recent(self, checker: ManualBaseChecker, entries: List[str]) -> None:
+        """Checks recent messages against newly added entries in the background"""
+        if not entries or not checker.supports_shadow or isinstance(checker, SpamChecker):
+            # spam entries alone don't block messages
+            return
+        task = asyncio.create_task(self._rescan_recent_task(checker, entries))
+        self._rescan_tasks.add(task)
+        task.add_done_callback(self._rescan_tasks.discard)
+
+    async def _rescan_recent_task(self, checker: ManualBaseChecker, entries: List[str]) -> None:
+        try:
+            name = next(n for n, c in self.checkers.items() if c is checker)
+            compiled = [checker._compile_entry(e) for e in entries]
+            min_time = utils.utcnow() - timedelta(minutes=RECENT_MESSAGES_MINUTES)
+
+            # newest first, skipping older versions of edited messages
+            seen: Set[Tuple[int, bool]] = set()
+            contexts: List[CheckContext] = []
+            for context in reversed(self._recent):
+                if context.message.created_at < min_time:
+                    break
+                if (key := (context.message.id, context.is_forwarded)) not in seen:
+                    seen.add(key)
+                    contexts.append(context)
+            logger.info(
+                f"checking {len(contexts)} recent messages against {len(entries)} new entries"
+            )
+
+            blocked = 0
+            for context in contexts:
+                prepared = await checker._prepare_match(context)
+                for c in compiled:
+                    if (result := checker._match_entry(c, context, prepared)) is None:
+                        continue
+                    if not self._forget_recent(context):
+                        # already blocked in the meantime
+                        break
+                    logger.info(f"new entry matched recent message {context.message.id}")
+                    checker_matches.inc(checker=name)
+                    if result.entry is not None:
+                        checker.hits.record(result.entry)
+                    await self._handle_blocked(context, name, result)
+                    blocked += 1
+                    break
+                # don't block the loop for too long with many messages
+                await asyncio.sleep(0)
+            if blocked:
+                logger.info(f"blocked {blocked} recent messages")
+        except Exception as e:
+            await error_handler.handle_task_error(self._bot, e)
+
+    def _forget_recent(self, context: CheckContext) -> bool:
+        """Removes the message from the recent messages, if the given context is still present"""
+        if not any(c is context for c in self._recent):
+            return False
+        message_id = context.message.id
+        self._recent = collections.deque(
+            (c for c in self._recent if c.message.id != message_id), maxlen=RECENT_MESSAGES
+        )
+        return True
+
+    def _is_host_allowed(self, host: str) -> bool:
+        # allowed hosts are excluded before running any checkers, skipping hashing/DNS lookups
+        if (entry := self.allowlist.match(host)) is None:
+            return False
+        logger.debug(f"skipping host '{host}', allowed explicitly by '{entry}'")
+        self.allowlist.hits.record(entry)
+        return True
+
+    async def _evaluate_shadow(self) -> None:
+        while True:
+            context = await self._shadow_queue.get()
+            for checker in self.get_checkers(ManualBaseChecker).values():
+                if not checker.shadow:
+                    continue
+                try:
+                    await checker.check_shadow(context)
+                except Exception as e:
+                    await error_handler.handle_task_error(self._bot, e)
+
     async def _should_check(self, message: disnake.Message) -> Tuple[bool, str]:
         if message.type not in MESSAGE_TYPES:
             return False, f"system message type ({message.type!r})"
@@ -181,11 +578,13 @@ class FilterCog(
         if not message.interaction_metadata and message.webhook_id:
             return False, "webhook"
 
-        author = CheckContext.get_author(message)
+        if (author := await self._get_author(message)) is None:
+            return False, "unknown member"
         if author.bot:
             return False, "bot"
 
-        ctx: types.Context = await self._bot.get_context(message)
+        with tracing.span("get_context"):
+            ctx: types.Context = await self._bot.get_context(message)
         if ctx.invoked_with:
             return False, "command"
 
@@ -196,9 +595,18 @@ class FilterCog(
 
         return True, ""
 
+    async def _get_author(self, message: disnake.Message) -> Optional[disnake.Member]:
+        if message.interaction_metadata:
+            # the original user's member isn't included in the message, may need to be fetched;
+            # usually cached already, but it may have been evicted from the cache again since
+            return await self.members.fetch(message.interaction_metadata.user.id)
+        return CheckContext.get_author(message)
+
     async def _handle_blocked(
-        self, context: CheckContext, reason: str, to_delete: AnyMessageList
+        self, context: CheckContext, checker_name: str, result: CheckResult
     ) -> None:
+        reason = result.reason
+        to_delete: AnyMessageList = result.messages or [context.message]
         logger.info(
             f"blocking {'forwarded ' if context.is_forwarded else ''}message(s) by "
             f"{str(context.author)}/{context.author.id} ('{context.string}') - {reason}"
@@ -206,12 +614,18 @@ class FilterCog(
 
         tasks: List[Awaitable[Any]] = []
 
+        # add to audit log
+        tasks.append(_timed("audit", self._record_block(context, checker_name, result)))
+
         # mute user
         tasks.append(
-            self._mute_user(
-                context.author,
-                timedelta(minutes=self.state.mute_minutes) if self.state.mute_minutes else None,
-                reason,
+            _timed(
+                "mute",
+                self._mute_user(
+                    context.author,
+                    timedelta(minutes=self.state.mute_minutes) if self.state.mute_minutes else None,
+                    reason,
+                ),
             )
         )
 
@@ -219,7 +633,7 @@ class FilterCog(
         if context.message.id not in (m.id for m in to_delete):
             to_delete = [*to_delete, context.message]
         logger.info(f"deleting {len(to_delete)} message(s): {[m.id for m in to_delete]}")
-        tasks.extend(m.delete() for m in to_delete)
+        tasks.extend(_timed("delete", m.delete()) for m in to_delete)
 
         delete_res = await asyncio.gather(*tasks, return_exceptions=True)
         for exc in (e for e in delete_res if isinstance(e, Exception)):
@@ -255,10 +669,33 @@ class FilterCog(
             report_channel = cast(
                 disnake.TextChannel, self._bot.get_channel(self.state.report_channel)
             )
-            await report_channel.send(embed=embed)
+            await _timed("report", report_channel.send(embed=embed))
 
         logger.info(f"successfully blocked message {context.message.id}")
 
+    async def _record_block(
+        self, context: CheckContext, checker_name: str, result: CheckResult
+    ) -> None:
+        if not self._storage.supports_audit:
+            return
+
+        event = BlockEvent(
+            timestamp=utils.utcnow(),
+            user_id=context.author.id,
+            channel_id=context.message.channel.id,
+            message_id=context.message.id,
+            checker=checker_name,
+            entry=result.entry,
+            reason=result.reason,
+            content=context.string,
+            is_forwarded=context.is_forwarded,
+        )
+        try:
+            await utils.run_in_executor(self._storage.record_block, event)
+        except Exception as e:
+            # don't let audit failures prevent the actual block
+            await error_handler.handle_task_error(self._bot, e)
+
     async def _mute_user(
         self, user: disnake.Member, duration: Optional[timedelta], reason: Optional[str]
     ) -> None:
@@ -266,8 +703,10 @@ class FilterCog(
             role = self._get_muted_role()
             assert role, "can't mute permanently without a mute role set"
             await user.add_roles(role, reason=reason)
+            self.muted_members.set_role(user.id, True)
         else:
             await user.timeout(duration=duration, reason=reason)
+            self.muted_members.set_timeout(user.id, disnake.utils.utcnow() + duration)
 
     def _get_muted_role(self) -> Optional[disnake.Role]:
         return self._guild.get_role(Config.muted_role_id) if Config.muted_role_id else None
@@ -293,24 +732,69 @@ class FilterCog(
         if role := self._get_muted_role():
             await user.remove_roles(role)
         await user.timeout(duration=None)
+        self.muted_members.remove(user.id)
 
         await ctx.send(f"Unmuted {str(user)}/{user.id}")
 
+    @multicmd.command(description="Deletes recent messages of a user in all channels")
+    async def purge(
+        self,
+        ctx: types.AnyContext,
+        user: disnake.User,
+        minutes: int = 60,
+    ) -> None:
+        if not 0 < minutes <= 14 * 24 * 60:
+            # messages older than 14 days can't be bulk-deleted
+            await ctx.send(
+                "Failed to purge messages, duration must be between 1 minute and 14 days"
+            )
+            return
+        if isinstance(ctx, disnake.AppCommandInter):
+            await ctx.response.defer()
+
+        since = utils.utcnow() - timedelta(minutes=minutes)
+        by_channel = self.recent_by_author.get(user.id, since)
+        deleted: List[int] = []
+        failed = 0
+        for channel_id, message_ids in by_channel.items():
+            channel = self._guild.get_channel_or_thread(channel_id)
+            if not isinstance(channel, (disnake.TextChannel, disnake.Thread, disnake.VoiceChannel)):
+                failed += len(message_ids)
+                continue
+            # bulk deletion is limited to 100 messages per request
+            for i in range(0, len(message_ids), 100):
+                chunk = message_ids[i : i + 100]
+                try:
+                    await _timed(
+                        "purge",
+                        channel.delete_messages([disnake.Object(id) for id in chunk]),
+                    )
+                except disnake.NotFound:
+                    # single message was already deleted
+                    pass
+                except disnake.HTTPException as e:
+                    logger.warning(f"failed to delete messages in {channel_id}: {e}")
+                    failed += len(chunk)
+                    continue
+                deleted.extend(chunk)
+        self.recent_by_author.discard(user.id, deleted)
+
+        logger.info(f"purged {len(deleted)} message(s) by {user}/{user.id} ({failed} failed)")
+        msg = f"Deleted {len(deleted)} message(s) by {str(user)}/{user.id}"
+        msg += f" in {len(by_channel)} channel(s)"
+        if failed:
+            msg += f", failed to delete {failed} message(s)"
+        await ctx.send(msg)
+
     @multicmd.command(description="Lists all currently muted users")
     async def muted(self, ctx: types.AnyContext) -> None:
-        # TODO: this is inefficient in large guilds
-        muted: Dict[disnake.Member, Optional[datetime]] = {}
-        for m in self._guild.members:
-            if disnake.utils.get(m.roles, id=Config.muted_role_id):
-                muted[m] = None
-            elif m.current_timeout:
-                muted[m] = m.current_timeout
+        muted = self.muted_members.muted()
 
         if muted:
             desc = "**name**  -  **expiry**\n"
             desc += "\n".join(
-                f'{member.mention}: {disnake.utils.format_dt(expiry) if expiry else "-"}'
-                for member, expiry in muted.items()
+                f'<@{member_id}>: {disnake.utils.format_dt(expiry) if expiry else "-"}'
+                for member_id, expiry in muted.items()
             )
         else:
             desc = "none"
@@ -331,15 +815,37 @@ class FilterCog(
         blocklist: ManualBaseChecker = get_checker_param(ManualBaseChecker),
         input: str = commands.Param(),
     ) -> None:
+        if (warnings := await self._check_admission(ctx, blocklist, input)) is None:
+            return
+
         logger.info(f"adding {input} to list")
         res = blocklist.entry_add(input)
         if res is True:
-            await ctx.send(f"Successfully added `{input}`")
+            self._rescan_recent(blocklist, [input])
+            await ctx.send(f"Successfully added `{input}`" + self._format_warnings(warnings))
         elif res is False:
             await ctx.send(f"List already contains `{input}`")
         else:
             await ctx.send(f"Unable to add `{input}` to list: `{res}`")
 
+    async def _check_admission(
+        self, ctx: types.AnyContext, blocklist: ManualBaseChecker, input: str
+    ) -> Optional[List[str]]:
+        """Returns warnings if the entry may be added, otherwise sends the error and returns None"""
+        if isinstance(ctx, disnake.AppCommandInter):
+            # checks may take a few seconds
+            await ctx.response.defer()
+        admission = await blocklist.check_admission(input)
+        if admission.error:
+            logger.info(f"rejected entry {input}: {admission.error}")
+            await ctx.send(f"Unable to add `{input}` to list: {admission.error}")
+            return None
+        return admission.warnings
+
+    @staticmethod
+    def _format_warnings(warnings: List[str]) -> str:
+        return "".join(f"\n:warning: {w}" for w in warnings)
+
     @filter.subcommand(name="remove", description="Removes an entry from a filter list")
     async def filter_remove(
         self,
@@ -377,6 +883,283 @@ class FilterCog(
 
         await ctx.send(s, **kwargs)
 
+    @filter.subcommand(
+        name="import", description="Adds all entries from a text/JSON file to a filter list"
+    )
+    async def filter_import(
+        self,
+        ctx: types.AnyContext,
+        blocklist: ManualBaseChecker = get_checker_param(ManualBaseChecker),
+        file: Optional[disnake.Attachment] = None,
+    ) -> None:
+        # prefix commands can't take attachments as parameters, use the message's attachment instead
+        if file is None and isinstance(ctx, commands.Context) and ctx.message.attachments:
+            file = ctx.message.attachments[0]
+        if file is None:
+            await ctx.send("No file attached")
+            return
+
+        try:
+            entries = parse_entries(await file.read(), file.filename)
+        except ValueError as e:  # also includes JSONDecodeError and UnicodeDecodeError
+            await ctx.send(f"Unable to parse `{file.filename}`: `{e}`")
+            return
+
+        if isinstance(ctx, disnake.AppCommandInter):
+            await ctx.response.defer()
+        # only run admission checks on new entries
+        rejected: Dict[str, str] = {}
+        warnings: Dict[str, List[str]] = {}
+        # `in blocklist` would scan all entries each time for most lists
+        existing = set(blocklist)
+        new_entries = list(dict.fromkeys(e for e in entries if e not in existing))
+        for entry, admission in (await blocklist.check_admission_many(new_entries)).items():
+            if admission.error:
+                rejected[entry] = admission.error
+            elif admission.warnings:
+                warnings[entry] = admission.warnings
+
+        logger.info(f"importing {len(entries)} entries from {file.filename} to list")
+        res = blocklist.entries_add(e for e in entries if e not in rejected)
+        res.rejected.update(rejected)
+        self._rescan_recent(blocklist, res.added)
+
+        s = (
+            f"Added {len(res.added)} entries, "
+            f"skipped {len(res.duplicates)} existing entries, "
+            f"rejected {len(res.rejected)} invalid entries"
+        )
+        if warnings:
+            s += f" ({len(warnings)} added entries with warnings)"
+        kwargs: Dict[str, Any] = {}
+        if res.rejected or warnings:
+            lines = "\n".join(
+                [
+                    *(f"{entry}  -  {err}" for entry, err in res.rejected.items()),
+                    *(f"{entry}  -  warning: {'; '.join(w)}" for entry, w in warnings.items()),
+                ]
+            )
+            if len(lines) > 1800:
+                kwargs["file"] = disnake.File(io.BytesIO(lines.encode()), "rejected.txt")
+            else:
+                s += ":\n```\n" + lines + "\n```"
+        await ctx.send(s, **kwargs)
+
+    @filter.subcommand(name="export", description="Exports all entries of a filter list as a file")
+    async def filter_export(
+        self,
+        ctx: types.AnyContext,
+        blocklist: BaseChecker = get_checker_param(BaseChecker),
+        format: Literal["txt", "json"] = "txt",
+    ) -> None:
+        if format == "json":
+            data = json.dumps(list(blocklist), indent=4)
+        else:
+            data = "\n".join(blocklist)
+
+        name = next(k for k, v in self.checkers.items() if v is blocklist)
+        await ctx.send(
+            f"List contains {len(blocklist)} element(s)",
+            file=disnake.File(io.BytesIO(data.encode()), f"{name}.{format}"),
+        )
+
+    @filter.subcommand(name="stats", description="Shows the most and least used entries of a list")
+    async def filter_stats(
+        self,
+        ctx: types.AnyContext,
+        blocklist: BaseChecker = get_checker_param(BaseChecker),
+        count: int = 10,
+    ) -> None:
+        if len(blocklist) == 0:
+            await ctx.send("List contains no elements.")
+            return
+
+        stats = [(entry, *blocklist.hits.get(entry)) for entry in blocklist]
+        hit = sorted((s for s in stats if s[1]), key=lambda s: s[1], reverse=True)
+        never_hit = [s[0] for s in stats if not s[1]]
+
+        def fmt(entry: str) -> str:
+            return disnake.utils.escape_markdown(entry)[:100]
+
+        embed = disnake.Embed(
+            title=f"{len(hit)}/{len(stats)} entries matched",
+            description=f"(since {disnake.utils.format_dt(blocklist.hits.since)})",
+        )
+        embed.add_field(
+            name="Top entries",
+            value="\n".join(
+                f"`{fmt(entry)}`: {n} (last: {disnake.utils.format_dt(last, 'R') if last else '-'})"
+                for entry, n, last in hit[:count]
+            )[:1024]
+            or "-",
+            inline=False,
+        )
+        embed.add_field(
+            name=f"Never matched ({len(never_hit)})",
+            value="\n".join(f"`{fmt(entry)}`" for entry in never_hit[:count])[:1024] or "-",
+            inline=False,
+        )
+
+        kwargs: Dict[str, Any] = {}
+        if len(never_hit) > count:
+            name = next(k for k, v in self.checkers.items() if v is blocklist)
+            lines = "\n".join(never_hit)
+            kwargs["file"] = disnake.File(io.BytesIO(lines.encode()), f"{name}_never_matched.txt")
+        await ctx.send(embed=embed, **kwargs)
+
+    @filter.subcommand(name="blocks", description="Shows recent blocks of a user")
+    async def filter_blocks(self, ctx: types.AnyContext, user: disnake.User) -> None:
+        if not isinstance(self._storage, SqliteStorage):
+            await ctx.send("The audit log requires the `sqlite` storage backend")
+            return
+
+        events = await utils.run_in_executor(self._storage.blocks_for_user, user.id)
+        if not events:
+            await ctx.send(f"No blocks found for {user.mention}")
+            return
+
+        lines = "\n".join(
+            f"{disnake.utils.format_dt(e.timestamp)} in <#{e.channel_id}> ({e.checker}): {e.reason}"
+            for e in events
+        )
+        embed = disnake.Embed(
+            title=f"Recent blocks of {str(user)} ({user.id})", description=lines[:4000]
+        )
+        await ctx.send(embed=embed)
+
+    @filter.subcommand(name="hits", description="Shows the number of blocks per list entry")
+    async def filter_hits(self, ctx: types.AnyContext, days: int = 7) -> None:
+        if not isinstance(self._storage, SqliteStorage):
+            await ctx.send("The audit log requires the `sqlite` storage backend")
+            return
+
+        since = utils.utcnow() - timedelta(days=days)
+        hits = await utils.run_in_executor(self._storage.hits_per_entry, since)
+        if not hits:
+            await ctx.send(f"No blocks in the last {days} day(s)")
+            return
+
+        lines = "\n".join(
+            f"{count:>6}  {checker}: {entry or '-'}" for checker, entry, count in hits
+        )
+        s = f"Blocks per entry in the last {days} day(s):\n"
+        kwargs: Dict[str, Any] = {}
+        if len(lines) > 1900:
+            kwargs["file"] = disnake.File(io.BytesIO(lines.encode()), "hits.txt")
+        else:
+            s += "```\n" + lines + "\n```"
+        await ctx.send(s, **kwargs)
+
+    # shadow entries
+
+    @filter.subgroup(name="shadow")
+    async def filter_shadow(self, ctx: types.AnyContext) -> None:
+        pass
+
+    @filter_shadow.subcommand(
+        name="add", description="Adds a shadow entry, which only records would-be hits"
+    )
+    async def filter_shadow_add(
+        self,
+        ctx: types.AnyContext,
+        blocklist: ManualBaseChecker = get_checker_param(ManualBaseChecker),
+        input: str = commands.Param(),
+    ) -> None:
+        if not blocklist.supports_shadow:
+            await ctx.send("This list does not support shadow entries")
+            return
+
+        if (warnings := await self._check_admission(ctx, blocklist, input)) is None:
+            return
+
+        logger.info(f"adding shadow entry {input} to list")
+        res = blocklist.shadow_add(input)
+        if res is True:
+            await ctx.send(
+                f"Successfully added shadow entry `{input}`" + self._format_warnings(warnings)
+            )
+        elif res is False:
+            await ctx.send(f"List already contains `{input}`")
+        else:
+            await ctx.send(f"Unable to add `{input}` to list: `{res}`")
+
+    @filter_shadow.subcommand(name="remove", description="Removes a shadow entry")
+    async def filter_shadow_remove(
+        self,
+        ctx: types.AnyContext,
+        blocklist: ManualBaseChecker = get_checker_param(ManualBaseChecker),
+        input: str = commands.Param(),
+    ) -> None:
+        logger.info(f"removing shadow entry {input} from list")
+        if blocklist.shadow.remove(input):
+            await ctx.send(f"Successfully removed shadow entry `{input}`")
+        else:
+            await ctx.send(f"List does not contain shadow entry `{input}`")
+
+    @filter_shadow.subcommand(
+        name="promote", description="Turns a shadow entry into a regular list entry"
+    )
+    async def filter_shadow_promote(
+        self,
+        ctx: types.AnyContext,
+        blocklist: ManualBaseChecker = get_checker_param(ManualBaseChecker),
+        input: str = commands.Param(),
+    ) -> None:
+        if (stats := blocklist.shadow.get(input)) is None:
+            await ctx.send(f"List does not contain shadow entry `{input}`")
+            return
+
+        logger.info(f"promoting shadow entry {input}")
+        res = blocklist.entry_add(input)
+        if isinstance(res, str):
+            await ctx.send(f"Unable to add `{input}` to list: `{res}`")
+            return
+        blocklist.shadow.remove(input)
+        if res is True:
+            self._rescan_recent(blocklist, [input])
+        await ctx.send(
+            f"Successfully promoted `{input}` ({stats.hits} would-be hits"
+            f" in {stats.evaluated} messages, {stats.cost_us:.1f}µs/message)"
+        )
+
+    @filter_shadow.subcommand(
+        name="list", description="Shows all shadow entries of a list, with hits and cost"
+    )
+    async def filter_shadow_list(
+        self,
+        ctx: types.AnyContext,
+        blocklist: ManualBaseChecker = get_checker_param(ManualBaseChecker),
+    ) -> None:
+        if len(blocklist.shadow) == 0:
+            await ctx.send("List contains no shadow entries.")
+            return
+
+        lines: List[str] = []
+        examples: List[str] = []
+        for entry in blocklist.shadow:
+            stats = blocklist.shadow.get(entry)
+            assert stats
+            last = (
+                disnake.utils.format_dt(stats.last_hit, "R") if stats.last_hit is not None else "-"
+            )
+            lines.append(
+                f"`{disnake.utils.escape_markdown(entry)[:100]}`: "
+                f"{stats.hits}/{stats.evaluated} messages, {stats.cost_us:.1f}µs/message"
+                f" (last hit: {last}, since {disnake.utils.format_dt(stats.added, 'd')})"
+            )
+            examples.extend(f"{entry}  -  {e}" for e in stats.examples)
+
+        embed = disnake.Embed(
+            title=f"{len(lines)} shadow entries", description="\n".join(lines)[:4000]
+        )
+        kwargs: Dict[str, Any] = {}
+        if examples:
+            name = next(k for k, v in self.checkers.items() if v is blocklist)
+            kwargs["file"] = disnake.File(
+                io.BytesIO("\n".join(examples).encode()), f"{name}_shadow_hits.txt"
+            )
+        await ctx.send(embed=embed, **kwargs)
+
     # config stuff
 
     @filter._command.group(name="config")
@@ -461,10 +1244,32 @@ class FilterCog(
                 f"```\nspam_repeat_count = {self.state.spam_checker_config.repeat_count}\n```"
             )
 
-    def _read_state(self) -> None:
-        with self._state_path.open("r") as f:
-            data: Dict[str, Any] = json.load(f)
+    @filter_config.command(
+        name="normalized_lists",
+        help="Adds/removes/shows lists that are matched against the normalized message text (lowercase, without lookalike/invisible characters)",
+    )
+    async def filter_config_normalized_lists(
+        self, ctx: types.Context, list_name: Optional[str] = None
+    ) -> None:
+        checkers = self._text_checkers()
+        if list_name is not None:
+            if list_name not in checkers:
+                await ctx.send(f"Invalid argument. Valid choices: {list(checkers.keys())}")
+                return
+            if list_name in self.state.normalized_lists:
+                self.state.normalized_lists.remove(list_name)
+                msg = f"Removed {list_name}"
+            else:
+                await utils.run_in_executor(normalize.build_table)
+                self.state.normalized_lists.add(list_name)
+                msg = f"Added {list_name}"
+            self._write_state()
+            self._apply_normalized_lists()
+            await ctx.send(msg)
+        else:
+            await ctx.send(f"```\nnormalized_lists = {self.state.normalized_lists}\n```")
 
+    def _migrate_state(self, data: Dict[str, Any]) -> None:
         is_old = False
         if isinstance(r := data.get("unfiltered_roles"), dict) and "$__set" in r:
             # strip '$__set'
@@ -477,12 +1282,9 @@ class FilterCog(
             data.pop("_muted_users")
 
         if is_old:
-            with self._state_path.open("w") as f:
-                json.dump(data, f)
+            # (the migrated state is written back by `_read_state`)
             logger.info("Migrated state to new format")
 
-        return super()._read_state()
-
 
 def setup(bot: types.Bot) -> None:
     bot.add_cog(FilterCog(bot))
@@ -12,7 +12,18 @@ class __Config:
     data_dir: str
     muted_role_id: Optional[int]
     git_commit: Optional[str]
+    # serve prometheus metrics on this port, if set
+    metrics_port: Optional[int]
+    metrics_host: str = "127.0.0.1"
+    # log a breakdown of messages that took longer than this to check (0 to disable)
+    slow_message_ms: int = 1000
+    # report the stack of code blocking the event loop for longer than this (0 to disable)
+    loop_lag_threshold_ms: int = 500
     enable_owner_eval: bool = False
+    # "json" or "sqlite"
+    storage: str = "json"
+    # don't cache all guild members, only fetch them on demand when needed
+    low_memory_members: bool = False
 
 
 def __get_value(field: Field[Any]) -> Any:
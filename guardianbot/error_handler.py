@@ -1,8 +1,13 @@
+import asyncio
+import collections
+import hashlib
 import io
 import sys
+import time
 import traceback
 import warnings
-from typing import Any, Optional
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
 
 import disnake
 from disnake.ext import commands
@@ -11,6 +16,11 @@ from . import types, utils
 
 _attr_suppress_help = "_suppress_help"
 
+# repeats of the same error within this many seconds are merged into one summary
+REPORT_WINDOW = 10 * 60
+# maximum number of distinct errors to keep track of
+MAX_TRACKED = 100
+
 ignored_exc = (
     commands.errors.UserInputError,
     commands.errors.CommandNotFound,
@@ -19,6 +29,95 @@ ignored_exc = (
 ignored_exc_exact = (commands.errors.CheckFailure, commands.errors.CheckAnyFailure)
 
 
+@dataclass
+class _Report:
+    # short description of the most recent occurrence
+    summary: str
+    # time of the last message sent to the owner for this error
+    reported: float
+    # number of occurrences since then
+    repeats: int = 0
+
+
+_reports: "collections.OrderedDict[str, _Report]" = collections.OrderedDict()
+_summary_task: Optional["asyncio.Task[None]"] = None
+_owner_channel: Optional[disnake.DMChannel] = None
+
+
+def _signature(exc: Optional[Exception]) -> str:
+    """Identifies an error by its type and the location it was raised at, ignoring the message"""
+    if exc is None:
+        return ""
+    parts = [f"{type(exc).__module__}.{type(exc).__qualname__}"]
+    if frames := traceback.extract_tb(exc.__traceback__):
+        parts.extend(f"{f.filename}:{f.name}:{f.lineno}" for f in frames)
+    else:
+        # without a traceback, the message is all we have
+        parts.append(str(exc))
+    return hashlib.sha1("\n".join(parts).encode()).hexdigest()
+
+
+async def _send_owner(bot: types.Bot, msg: str, file: Optional[disnake.File] = None) -> None:
+    global _owner_channel
+    if _owner_channel is None:
+        owner_id = await utils.owner_id(bot)
+        user = bot.get_user(owner_id) or await bot.fetch_user(owner_id)
+        _owner_channel = user.dm_channel or await user.create_dm()
+    await _owner_channel.send(msg, files=[file] if file else [])
+
+
+async def _send_summaries(bot: types.Bot) -> None:
+    global _summary_task
+    try:
+        await asyncio.sleep(REPORT_WINDOW)
+    finally:
+        _summary_task = None
+
+    now = time.monotonic()
+    lines: List[str] = []
+    for sig, report in list(_reports.items()):
+        if report.repeats:
+            lines.append(f"{report.repeats}x {report.summary}")
+            report.reported = now
+            report.repeats = 0
+        elif now - report.reported >= REPORT_WINDOW:
+            del _reports[sig]
+    if not lines:
+        return
+
+    msg = f"repeated errors in the last {REPORT_WINDOW // 60} minutes:\n"
+    for i, line in enumerate(lines):
+        if len(msg) + len(line) >= 1950:
+            msg += f"(and {len(lines) - i} more)"
+            break
+        msg += f"{line}\n"
+    try:
+        await _send_owner(bot, msg)
+    except Exception:
+        print("failed sending error summary:", file=sys.stderr)
+        traceback.print_exc(file=sys.stderr)
+
+
+def _is_repeat(bot: types.Bot, exc: Optional[Exception], summary: str) -> bool:
+    """Records an occurrence of the error, returns whether it was already reported recently"""
+    global _summary_task
+    sig = _signature(exc)
+    now = time.monotonic()
+
+    if (report := _reports.get(sig)) and now - report.reported < REPORT_WINDOW:
+        report.summary = summary
+        report.repeats += 1
+        if _summary_task is None:
+            _summary_task = asyncio.get_running_loop().create_task(_send_summaries(bot))
+        return True
+
+    _reports[sig] = _Report(summary, now)
+    _reports.move_to_end(sig)
+    while len(_reports) > MAX_TRACKED:
+        _reports.popitem(last=False)
+    return False
+
+
 async def _handle_error(bot: types.Bot, exc: Optional[Exception]) -> bool:
     try:
         file = None
@@ -28,6 +127,9 @@ async def _handle_error(bot: types.Bot, exc: Optional[Exception]) -> bool:
         elif exc:
             msg = str(exc).replace("`", "'")
             msg = f"{type(exc).__name__}: `{msg}`\n"
+            summary = msg.strip()[:200]
+            if _is_repeat(bot, exc, summary):
+                return False
             full = "".join(traceback.format_exception(type(exc), exc, exc.__traceback__))
 
             if len(msg) + len(full) < 2000:
@@ -36,9 +138,10 @@ async def _handle_error(bot: types.Bot, exc: Optional[Exception]) -> bool:
                 file = disnake.File(io.BytesIO(full.encode()), "traceback.txt")
         else:
             msg = "something is definitely broken"
+            if _is_repeat(bot, exc, msg):
+                return False
 
-        user = await bot.fetch_user(await utils.owner_id(bot))
-        await user.send(msg, files=[file] if file else [])
+        await _send_owner(bot, msg, file)
     except Exception:
         print("failed sending exception:", file=sys.stderr)
         traceback.print_exc(file=sys.stderr)
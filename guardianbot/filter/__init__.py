@@ -4,4 +4,6 @@ from .bad_domains_checker import *
 from .ip_checker import *
 from .list_checker import *
 from .regex_checker import *
+from .shadow import *
 from .spam_checker import *
+from .watcher import *
@@ -1,19 +1,42 @@
-import json
+import functools
+import hashlib
 import logging
 import os
-from dataclasses import dataclass
-from typing import Any, Collection, Iterator, List, Optional, Sequence, Union, cast
+from dataclasses import dataclass, field
+from typing import (
+    Any,
+    Callable,
+    Collection,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+    cast,
+)
 
 import aiohttp
 import disnake
 from disnake import ui
 
-from .. import types
+from .. import persistence, storage, types, utils
 from ..config import Config
+from .hits import HitStats
+from .hosts import normalize_host
+from .normalize import normalize_text
+from .shadow import ShadowEntries
 
 __all__ = [
     "AnyMessageList",
+    "Snapshot",
     "CheckContext",
+    "CheckResult",
+    "BulkResult",
+    "AdmissionResult",
     "BaseChecker",
     "ExternalBaseChecker",
     "ManualBaseChecker",
@@ -22,15 +45,36 @@ __all__ = [
 AnyMessageList = Sequence[Union[disnake.Message, disnake.PartialMessage]]
 
 
+@dataclass(frozen=True)
+class Snapshot:
+    """
+    Immutable state of a checker; the entries, and the lookup structures derived from them.
+    Readers take a reference, writers publish an entirely new snapshot.
+    """
+
+    entries: Tuple[str, ...]
+    # compiled patterns, parsed networks, ... (depends on the checker)
+    index: Any
+
+
 @dataclass(frozen=True)
 class CheckContext:
     string: str
     message: disnake.Message
     author: disnake.Member
     is_forwarded: bool
+    # normalized hosts of all links in the message, excluding explicitly allowed hosts
+    hosts: Tuple[str, ...] = ()
 
     @classmethod
-    def from_message(cls, msg: types.AnyMessage, *, parent: disnake.Message):
+    def from_message(
+        cls,
+        msg: types.AnyMessage,
+        *,
+        parent: disnake.Message,
+        author: Optional[disnake.Member] = None,
+        is_host_allowed: Optional[Callable[[str], bool]] = None,
+    ):
         strings: List[str] = [msg.content]
         for embed in msg.embeds:
             embed_contents = [embed.title or "", embed.description or ""]
@@ -43,13 +87,23 @@ class CheckContext:
             if isinstance(component, ui.TextDisplay):
                 strings.append(component.content)
 
+        string = "\n".join(s for s in strings if s)
+        hosts = dict.fromkeys(
+            h for raw in utils.extract_hosts(string) if (h := normalize_host(raw)) is not None
+        )
         return cls(
-            "\n".join(s for s in strings if s),
+            string,
             parent,
-            cls.get_author(parent),
+            author or cls.get_author(parent),
             msg != parent,
+            tuple(h for h in hosts if not (is_host_allowed and is_host_allowed(h))),
         )
 
+    @functools.cached_property
+    def normalized(self) -> str:
+        """Normalized view of the string (see `normalize_text`), computed at most once"""
+        return normalize_text(self.string)
+
     @staticmethod
     def get_author(msg: disnake.Message) -> disnake.Member:
         author = msg.author
@@ -66,85 +120,368 @@ class CheckResult:
     reason: str
     # hostname if host-based block (IP, bad-domains, ...)
     host: Optional[str] = None
+    # list entry that matched, if applicable
+    entry: Optional[str] = None
     # messages to delete, if multiple
     messages: Optional[AnyMessageList] = None
 
 
+@dataclass
+class BulkResult:
+    # entries that were newly added to the list
+    added: List[str] = field(default_factory=list)
+    # entries that were already in the list (or duplicated in the input)
+    duplicates: List[str] = field(default_factory=list)
+    # entry -> validation error
+    rejected: Dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class AdmissionResult:
+    # reason for rejecting the entry, if any
+    error: Optional[str] = None
+    # potential problems that don't prevent adding the entry
+    warnings: List[str] = field(default_factory=list)
+
+
 logger = logging.getLogger(__name__)
 
 
 class BaseChecker(Collection[str]):
+    # whether the checker only looks at `CheckContext.hosts`
+    host_based: bool = False
+
     def __init__(self, cache_name: str):
         self.__cache_name = cache_name
-        self._strings: List[str] = []
+        self._snapshot = Snapshot((), self._build_index(()))
+        self._storage = storage.get()
+        self._writer = persistence.DebouncedWriter(
+            cache_name,
+            lambda: list(self._snapshot.entries),
+            functools.partial(self._storage.save_list, cache_name),
+        )
 
         self._load_list()
+        self.hits = HitStats(self._storage, cache_name, lambda: set(self._snapshot.entries))
 
     async def check_match(self, context: CheckContext) -> Optional[CheckResult]:
         """Returns a reason string if the input matched and should be blocked, returns None otherwise"""
         raise NotImplementedError
 
+    @property
+    def cache_name(self) -> str:
+        return self.__cache_name
+
     @property
     def cache_path(self) -> str:
         return os.path.join(Config.data_dir, self.__cache_name)
 
     def _load_list(self) -> None:
-        if not os.path.isfile(self.cache_path):
+        if (entries := self._storage.load_list(self.__cache_name)) is None:
             return
-        with open(self.cache_path, "r") as f:
-            self._strings.clear()
-            self._strings.extend(json.load(f))
+        self._publish(tuple(entries), self._build_index(tuple(entries)))
         logger.debug(f"loaded {len(self)} entries for {self}")
 
+    async def reload(self) -> None:
+        """Reloads entries from storage, applying only the added/removed entries to the index"""
+        if self._writer.pending:
+            # the file is about to be overwritten anyway
+            logger.debug(f"not reloading {self}, write pending")
+            return
+
+        entries = await utils.run_in_executor(self._storage.load_list, self.__cache_name) or []
+        if self._writer.pending:
+            # list was modified while loading
+            return
+
+        snapshot = self._snapshot
+        current = set(snapshot.entries)
+        if invalid := {
+            e: err
+            for e in entries
+            if e not in current and (err := self._validate_entry(e)) is not None
+        }:
+            logger.warning(f"ignoring invalid entries while reloading {self}: {invalid}")
+            entries = [e for e in entries if e not in invalid]
+
+        new = set(entries)
+        added = [e for e in entries if e not in current]
+        removed = [e for e in snapshot.entries if e not in new]
+
+        new_entries = tuple(entries)
+        index = snapshot.index
+        if removed:
+            index = self._index_remove(index, new_entries, removed)
+        if added:
+            index = self._index_add(index, new_entries, added)
+        self._publish(new_entries, index)
+        if added or removed:
+            logger.info(f"reloaded {self}: {len(added)} added, {len(removed)} removed")
+
+    # override in subclasses
+
+    def memory_usage(self) -> Dict[str, Any]:
+        """Returns the (potentially large) data structures of the checker, for diagnostics"""
+        return {"entries": self._snapshot.entries, "hits": self.hits._hits}
+
+    def _validate_entry(self, input: str) -> Optional[str]:
+        """Returns an error string if the input is not a valid entry, returns None otherwise"""
+        return None
+
+    def _build_index(self, entries: Tuple[str, ...]) -> Any:
+        """
+        Builds any derived lookup structures (compiled patterns, parsed networks, ...)
+        from the given entries; must not modify any state, the result is published separately
+        """
+        return None
+
+    def _index_add(self, index: Any, entries: Tuple[str, ...], added: List[str]) -> Any:
+        """
+        Returns a new index including the added entries, without modifying the given one;
+        `entries` are all entries of the new snapshot. Rebuilds the entire index by default.
+        """
+        return self._build_index(entries)
+
+    def _index_remove(self, index: Any, entries: Tuple[str, ...], removed: List[str]) -> Any:
+        """
+        Returns a new index without the removed entries, without modifying the given one;
+        `entries` are all entries of the new snapshot. Rebuilds the entire index by default.
+        """
+        return self._build_index(entries)
+
+    def _publish(self, entries: Tuple[str, ...], index: Any) -> None:
+        # a single assignment, readers either see the old or the new snapshot
+        self._snapshot = Snapshot(entries, index)
+
     def _write_list(self) -> None:
-        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
-        with open(self.cache_path, "w") as f:
-            json.dump(list(self._strings), f, indent=4)
-        logger.debug(f"wrote {len(self)} entries for {self}")
+        # the actual write happens asynchronously, bursts of changes are coalesced
+        self._writer.schedule()
+        logger.debug(f"scheduled write of {len(self)} entries for {self}")
+
+    async def flush(self) -> None:
+        await self._writer.flush()
+        await self.hits.flush()
+
+    def flush_sync(self) -> None:
+        self._writer.flush_sync()
+        self.hits.flush_sync()
 
     def __len__(self) -> int:
-        return len(self._strings)
+        return len(self._snapshot.entries)
 
     def __iter__(self) -> Iterator[str]:
-        yield from self._strings
+        yield from self._snapshot.entries
 
     def __contains__(self, obj: Any) -> bool:
-        return obj in self._strings
+        return obj in self._snapshot.entries
 
 
 class ManualBaseChecker(BaseChecker):
+    # whether text-based checkers should match against `CheckContext.normalized`
+    match_normalized: bool = False
+
+    def __init__(self, cache_name: str):
+        super().__init__(cache_name)
+        self.shadow: ShadowEntries[Any] = ShadowEntries(
+            self._storage, cache_name, self._compile_entry
+        )
+
     def entry_add(self, input: str) -> Union[bool, str]:
         """
         Adds given input to list, returning True if successful, False if value already exists,
         or a string response if other validation checks failed
         """
-        if input in self._strings:
+        if (err := self._validate_entry(input)) is not None:
+            return err
+        snapshot = self._snapshot
+        if input in snapshot.entries:
             return False
-        self._strings.append(input)
+        entries = (*snapshot.entries, input)
+        self._publish(entries, self._index_add(snapshot.index, entries, [input]))
         self._write_list()
         return True
 
+    def entries_add(self, inputs: Iterable[str]) -> BulkResult:
+        """
+        Validates and adds all given inputs to list, writing the list and updating
+        the index only once
+        """
+        result = BulkResult()
+        snapshot = self._snapshot
+        existing = set(snapshot.entries)
+        for input in inputs:
+            if (err := self._validate_entry(input)) is not None:
+                result.rejected[input] = err
+            elif input in existing:
+                result.duplicates.append(input)
+            else:
+                existing.add(input)
+                result.added.append(input)
+
+        if result.added:
+            entries = (*snapshot.entries, *result.added)
+            self._publish(entries, self._index_add(snapshot.index, entries, result.added))
+            self._write_list()
+        return result
+
     def entry_remove(self, input: str) -> bool:
         """
         Removes given input from list, returning True if successful, or False if value doesn't exist
         """
-        if input not in self._strings:
+        snapshot = self._snapshot
+        if input not in snapshot.entries:
             return False
-        self._strings.remove(input)
+        entries = tuple(e for e in snapshot.entries if e != input)
+        self._publish(entries, self._index_remove(snapshot.index, entries, [input]))
         self._write_list()
         return True
 
+    async def check_admission(self, input: str) -> AdmissionResult:
+        """
+        Runs (potentially expensive) checks on a new entry before it gets added;
+        invalid entries are reported by `entry_add` instead
+        """
+        return AdmissionResult()
+
+    async def check_admission_many(self, inputs: List[str]) -> Dict[str, AdmissionResult]:
+        """Runs `check_admission` on multiple new entries, e.g. for bulk imports"""
+        return {input: await self.check_admission(input) for input in inputs}
+
+    def shadow_add(self, input: str) -> Union[bool, str]:
+        """
+        Adds given input as a shadow entry, returning True if successful, False if value already
+        exists (in the list or as a shadow entry), or a string response if validation failed
+        """
+        if (err := self._validate_entry(input)) is not None:
+            return err
+        if input in self._snapshot.entries or input in self.shadow:
+            return False
+        self.shadow.add(input)
+        return True
+
+    async def check_shadow(self, context: CheckContext) -> None:
+        """Evaluates all shadow entries, recording would-be hits"""
+        await self.shadow.evaluate(context, self._prepare_match, self._match_entry)
+
+    def memory_usage(self) -> Dict[str, Any]:
+        return {**super().memory_usage(), "shadow": self.shadow._compiled}
+
+    def _text(self, context: CheckContext) -> str:
+        return context.normalized if self.match_normalized else context.string
+
+    @property
+    def supports_shadow(self) -> bool:
+        return type(self)._match_entry is not ManualBaseChecker._match_entry
+
+    async def flush(self) -> None:
+        await super().flush()
+        await self.shadow.flush()
+
+    def flush_sync(self) -> None:
+        super().flush_sync()
+        self.shadow.flush_sync()
+
+    # override in subclasses
+
+    def _compile_entry(self, entry: str) -> Any:
+        """Converts a (valid) entry into the form used by `_match_entry`"""
+        return entry
+
+    async def _prepare_match(self, context: CheckContext) -> Any:
+        """
+        Gathers any data `_match_entry` needs that requires I/O (e.g. resolved addresses),
+        once per message; the result is passed to `_match_entry` for each entry
+        """
+        return None
+
+    def _match_entry(
+        self, compiled: Any, context: CheckContext, prepared: Any
+    ) -> Optional[CheckResult]:
+        """
+        Checks the input against a single entry, without any I/O;
+        used for evaluating shadow entries and for checking recent messages against new entries
+        """
+        raise NotImplementedError
+
+
+class _UpdateMeta(utils.StrictModel):
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    sha256: Optional[str] = None
+
 
 class ExternalBaseChecker(BaseChecker):
     def __init__(self, cache_name: str, url: str):
         super().__init__(cache_name)
         self._url = url
 
+        # validators of the last successful update; only used if the cached list exists,
+        # otherwise the next update would never fetch any entries
+        raw_meta = self._storage.load_state(self._meta_name) if self._snapshot.entries else None
+        self._meta = _UpdateMeta.parse_raw(raw_meta) if raw_meta else _UpdateMeta()
+
+    @property
+    def _meta_name(self) -> str:
+        return f"{self.cache_name}.meta"
+
     async def update(self, session: aiohttp.ClientSession) -> None:
-        async with session.get(self._url) as res:
+        headers: Dict[str, str] = {}
+        if self._meta.etag:
+            headers["If-None-Match"] = self._meta.etag
+        if self._meta.last_modified:
+            headers["If-Modified-Since"] = self._meta.last_modified
+
+        async with session.get(self._url, headers=headers) as res:
+            if res.status == 304:
+                logger.debug(f"{self}: not modified")
+                return
             res.raise_for_status()
-            self._strings = await self._process_update(res)
-        self._write_list()
 
-    async def _process_update(self, res: aiohttp.ClientResponse) -> List[str]:
+            # stream response, hashing chunks as they come in
+            hasher = hashlib.sha256()
+            buf = bytearray()
+            async for chunk in res.content.iter_chunked(64 * 1024):
+                hasher.update(chunk)
+                buf += chunk
+
+            meta = _UpdateMeta(
+                etag=res.headers.get("ETag") or None,
+                last_modified=res.headers.get("Last-Modified") or None,
+                sha256=hasher.hexdigest(),
+            )
+
+        if meta.sha256 == self._meta.sha256:
+            logger.debug(f"{self}: content unchanged")
+        else:
+            # parse and build the new index off the loop, then publish both at once;
+            # the buffer is passed as-is, copying it would double the peak memory usage
+            entries, index, added, removed = await utils.run_in_executor(
+                self._build_update, buf, self._snapshot.index
+            )
+            del buf
+            self._publish(entries, index)
+            self._write_list()
+            logger.info(f"updated {self}: {added} added, {removed} removed")
+
+        self._meta = meta
+        await utils.run_in_executor(self._storage.save_state, self._meta_name, meta.json())
+
+    def _build_update(
+        self, data: bytes, old_index: FrozenSet[str]
+    ) -> Tuple[Tuple[str, ...], FrozenSet[str], int, int]:
+        entries = tuple(self._process_update(data))
+        index = self._build_index(entries)
+        return entries, index, len(index - old_index), len(old_index - index)
+
+    def _process_update(self, data: bytes) -> List[str]:
+        """Parses the downloaded list; runs in an executor"""
         raise NotImplementedError
+
+    def memory_usage(self) -> Dict[str, Any]:
+        return {**super().memory_usage(), "index": self._snapshot.index}
+
+    def _build_index(self, entries: Tuple[str, ...]) -> FrozenSet[str]:
+        return frozenset(entries)
+
+    def __contains__(self, obj: Any) -> bool:
+        return obj in self._snapshot.index
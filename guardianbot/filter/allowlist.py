@@ -1,8 +1,77 @@
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
 from ._base import ManualBaseChecker
+from .hosts import normalize_host
 
 __all__ = ["AllowList"]
 
+_label_re = re.compile(r"[a-z0-9_-]+(?:\.[a-z0-9_-]+)*\.?", re.I)
+
+
+class _Node:
+    __slots__ = ("children", "exact", "wildcard")
+
+    def __init__(self):
+        self.children: Dict[str, _Node] = {}
+        # entries ending at this node, i.e. `example.com` or `*.example.com`
+        self.exact: Optional[str] = None
+        self.wildcard: Optional[str] = None
+
+
+def _labels(host: str) -> List[str]:
+    return (normalize_host(host) or "").split(".")[::-1]
+
 
 class AllowList(ManualBaseChecker):
+    """
+    Hosts that are never blocked by host-based checkers.
+    Entries are either exact hosts (`example.com`) or wildcards (`*.example.com`),
+    which match all subdomains (but not the domain itself).
+    """
+
     def __init__(self):
         super().__init__("allowlist.json")
+
+    def match(self, host: str) -> Optional[str]:
+        """Returns the entry matching the given host, if any"""
+        node: _Node = self._snapshot.index
+        wildcard: Optional[str] = None
+        for label in _labels(host):
+            # a wildcard matches if there's at least one more label; the most specific one wins
+            if node.wildcard is not None:
+                wildcard = node.wildcard
+            if (child := node.children.get(label)) is None:
+                return wildcard
+            node = child
+        return node.exact or wildcard
+
+    @staticmethod
+    def _insert(root: _Node, entries: Iterable[str]) -> None:
+        for entry in entries:
+            wildcard = entry.startswith("*.")
+            node = root
+            for label in _labels(entry[2:] if wildcard else entry):
+                node = node.children.setdefault(label, _Node())
+            if wildcard:
+                node.wildcard = entry
+            else:
+                node.exact = entry
+
+    # overridden methods
+
+    def _validate_entry(self, input: str) -> Optional[str]:
+        host = normalize_host(input[2:] if input.startswith("*.") else input)
+        if not host or not _label_re.fullmatch(host):
+            return "Invalid host, expected a hostname like `example.com` or `*.example.com`"
+        return None
+
+    def memory_usage(self) -> Dict[str, Any]:
+        return {**super().memory_usage(), "trie": self._snapshot.index}
+
+    def _build_index(self, entries: Tuple[str, ...]) -> _Node:
+        # the trie is small and cheap to build, so it's rebuilt on every change
+        # instead of being modified in place while other tasks may be reading it
+        root = _Node()
+        self._insert(root, entries)
+        return root
@@ -1,15 +1,16 @@
 import hashlib
+import json
 from typing import List, Optional
 
-import aiohttp
-
-from .. import utils
 from ._base import CheckContext, CheckResult, ExternalBaseChecker
+from .hosts import registrable_domain
 
 __all__ = ["DiscordBadDomainsChecker"]
 
 
 class DiscordBadDomainsChecker(ExternalBaseChecker):
+    host_based = True
+
     def __init__(self):
         super().__init__(
             "discord_bad_domains.cache",
@@ -17,12 +18,15 @@ class DiscordBadDomainsChecker(ExternalBaseChecker):
         )
 
     async def check_match(self, context: CheckContext) -> Optional[CheckResult]:
-        hosts = utils.extract_hosts(context.string)
-        for host in hosts:
-            h = hashlib.sha256(host.lower().encode()).hexdigest()
-            if h in self:
-                return CheckResult(f"filtered host: `{host}` (bad-domains hash)", host=host)
+        for host in context.hosts:
+            # also check the registrable domain, e.g. `evil.com` for `sub.evil.com`
+            for name in dict.fromkeys((host, registrable_domain(host) or host)):
+                h = hashlib.sha256(name.encode()).hexdigest()
+                if h in self:
+                    return CheckResult(
+                        f"filtered host: `{name}` (bad-domains hash)", host=host, entry=h
+                    )
         return None
 
-    async def _process_update(self, res: aiohttp.ClientResponse) -> List[str]:
-        return [x.lower() for x in await res.json()]
+    def _process_update(self, data: bytes) -> List[str]:
+        return [x.lower() for x in json.loads(data)]
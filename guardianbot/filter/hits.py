@@ -0,0 +1,68 @@
+import functools
+import json
+import time
+from datetime import datetime, timezone
+from typing import Callable, Collection, Dict, List, Optional, Tuple
+
+from .. import persistence, storage
+
+__all__ = ["HitStats"]
+
+# hit counts are written at most once per minute
+FLUSH_INTERVAL = 60
+
+
+class HitStats:
+    """
+    Keeps track of the number of hits and the time of the last hit of each entry in a list.
+
+    Stored in a compact format (`{entry: [count, last_hit_unix]}`), and flushed periodically.
+    """
+
+    def __init__(
+        self,
+        backend: storage.Storage,
+        list_name: str,
+        current_entries: Callable[[], Collection[str]],
+    ):
+        self._name = f"{list_name}.hits"
+        self._current_entries = current_entries
+
+        self.since = int(time.time())
+        self._hits: Dict[str, List[int]] = {}
+        if raw := backend.load_state(self._name):
+            data = json.loads(raw)
+            self.since = data["since"]
+            self._hits = data["hits"]
+
+        self._writer = persistence.DebouncedWriter(
+            self._name,
+            self._snapshot,
+            functools.partial(backend.save_state, self._name),
+            delay=FLUSH_INTERVAL,
+        )
+
+    def record(self, entry: str) -> None:
+        if (h := self._hits.get(entry)) is None:
+            h = self._hits[entry] = [0, 0]
+        h[0] += 1
+        h[1] = int(time.time())
+        self._writer.schedule()
+
+    def get(self, entry: str) -> Tuple[int, Optional[datetime]]:
+        """Returns the number of hits and the time of the last hit of the given entry"""
+        if (h := self._hits.get(entry)) is None:
+            return 0, None
+        return h[0], datetime.fromtimestamp(h[1], timezone.utc)
+
+    def _snapshot(self) -> str:
+        # drop entries that were removed from the list in the meantime
+        current = self._current_entries()
+        self._hits = {e: h for e, h in self._hits.items() if e in current}
+        return json.dumps({"since": self.since, "hits": self._hits}, separators=(",", ":"))
+
+    async def flush(self) -> None:
+        await self._writer.flush()
+
+    def flush_sync(self) -> None:
+        self._writer.flush_sync()
@@ -0,0 +1,109 @@
+"""
+Normalization of hosts extracted from links, shared by all host-based checkers,
+so that e.g. `Evil.com.`, `evil.com:443` and `user@evil.com` are treated the same.
+"""
+
+import functools
+import logging
+from pathlib import Path
+from typing import List, Optional, Set
+
+__all__ = ["normalize_host", "registrable_domain"]
+
+logger = logging.getLogger(__name__)
+
+# maximum number of hosts/domains to memoize
+CACHE_SIZE = 10000
+
+# snapshot of https://publicsuffix.org/list/public_suffix_list.dat
+PUBLIC_SUFFIX_LIST = Path(__file__).with_name("public_suffix_list.dat")
+
+
+def _to_ascii(host: str) -> str:
+    if host.isascii():
+        return host
+    labels = []
+    for label in host.split("."):
+        try:
+            labels.append(label.encode("idna").decode("ascii") if label else label)
+        except UnicodeError:
+            # not a valid IDNA label, keep it as-is
+            labels.append(label)
+    return ".".join(labels)
+
+
+class _PublicSuffixList:
+    def __init__(self, path: Path):
+        self.rules: Set[str] = set()
+        self.wildcards: Set[str] = set()
+        self.exceptions: Set[str] = set()
+
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not (line := line.strip()) or line.startswith("//"):
+                    continue
+                rule = _to_ascii(line.split()[0].lower())
+                if rule.startswith("!"):
+                    self.exceptions.add(rule[1:])
+                elif rule.startswith("*."):
+                    self.wildcards.add(rule[2:])
+                else:
+                    self.rules.add(rule)
+        logger.debug(
+            f"loaded public suffix list with {len(self.rules) + len(self.wildcards)} rules"
+        )
+
+    def suffix_labels(self, labels: List[str]) -> int:
+        """Returns the number of labels of the public suffix of the given host labels"""
+        for i in range(len(labels)):
+            suffix = ".".join(labels[i:])
+            if suffix in self.exceptions:
+                # exception rules take precedence, and drop the leftmost label
+                return len(labels) - i - 1
+            if suffix in self.rules:
+                return len(labels) - i
+            if i + 1 < len(labels) and ".".join(labels[i + 1 :]) in self.wildcards:
+                return len(labels) - i
+        # implicit `*` rule
+        return 1
+
+
+@functools.lru_cache(maxsize=None)
+def _psl() -> _PublicSuffixList:
+    return _PublicSuffixList(PUBLIC_SUFFIX_LIST)
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def normalize_host(netloc: str) -> Optional[str]:
+    """
+    Normalizes the host part of a URL authority; strips userinfo, port and trailing dots,
+    converts it to lowercase and IDNA (punycode). Returns None if no host remains.
+    """
+    # browsers treat `\` like `/`, i.e. as the end of the authority;
+    # e.g. `evil.com\@discord.com` goes to `evil.com`, not `discord.com`
+    host = netloc.partition("\\")[0].rpartition("@")[2]
+    if host.startswith("["):
+        # IPv6 literal, with optional port
+        host = host[1:].partition("]")[0]
+    else:
+        name, sep, port = host.rpartition(":")
+        if sep and (not port or port.isdigit()):
+            host = name
+    host = _to_ascii(host.strip().rstrip(".").lower())
+    return host or None
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def registrable_domain(host: str) -> Optional[str]:
+    """
+    Returns the registrable domain (public suffix + one label) of a normalized host,
+    e.g. `example.co.uk` for `a.b.example.co.uk`, or None if the host is a public suffix itself
+    """
+    labels = host.split(".")
+    if not all(labels) or labels[-1].isdigit() or ":" in host:
+        # empty labels, or IP address
+        return None
+    count = _psl().suffix_labels(labels) + 1
+    if count > len(labels):
+        return None
+    return ".".join(labels[-count:])
@@ -1,31 +1,43 @@
 import asyncio
+import collections
 import logging
 import socket
 from ipaddress import IPv4Address, IPv4Network
-from typing import Dict, List, Optional, Set, Union, cast
+from typing import Any, Dict, List, Optional, Tuple, cast
 
 import aiodns
 
-from .. import utils
+from .. import metrics
 from ._base import CheckContext, CheckResult, ManualBaseChecker
 
 __all__ = ["IPChecker"]
 
 logger = logging.getLogger(__name__)
 
+dns_cache_hits = metrics.Counter("guardianbot_dns_cache_hits_total", "DNS cache hits")
+dns_cache_misses = metrics.Counter("guardianbot_dns_cache_misses_total", "DNS cache misses")
+
+# maximum number of hosts to keep resolved addresses for
+DNS_CACHE_SIZE = 10000
+
 
 class IPChecker(ManualBaseChecker):
+    host_based = True
+
     def __init__(self):
         self._resolver: aiodns.DNSResolver = aiodns.DNSResolver(["1.1.1.1"])
 
-        self._networks: Set[IPv4Network] = set()
-        self._cache: Dict[str, List[str]] = {}
+        # host -> addresses, least recently used first
+        self._cache: "collections.OrderedDict[str, List[str]]" = collections.OrderedDict()
 
         super().__init__("blocklist_ips.json")
 
     async def resolve(self, host: str) -> List[str]:
-        if host in self._cache:
-            return self._cache[host]
+        if (cached := self._cache.get(host)) is not None:
+            dns_cache_hits.inc()
+            self._cache.move_to_end(host)
+            return cached
+        dns_cache_misses.inc()
 
         addrs: List[str] = []
         try:
@@ -36,12 +48,14 @@ class IPChecker(ManualBaseChecker):
             pass
 
         self._cache[host] = addrs
+        while len(self._cache) > DNS_CACHE_SIZE:
+            self._cache.popitem(last=False)
         return addrs
 
     # overridden methods
 
     async def check_match(self, context: CheckContext) -> Optional[CheckResult]:
-        hosts = utils.extract_hosts(context.string)
+        hosts = context.hosts
         if not hosts:
             return None
         logger.debug(f"extracted hosts: {hosts}")
@@ -49,33 +63,69 @@ class IPChecker(ManualBaseChecker):
         ip_groups: List[List[str]] = await asyncio.gather(*map(self.resolve, hosts))
         logger.debug(f"resolved IPs: {ip_groups}")
 
-        for net in self._networks:
+        networks: Tuple[Tuple[str, IPv4Network], ...] = self._snapshot.index
+        for entry, net in networks:
             for host, ips in zip(hosts, ip_groups):
                 for ip in ips:
                     if IPv4Address(ip) in net:
-                        return CheckResult(f"filtered IP: `{ip}` (matched `{net}`)", host=host)
+                        return CheckResult(
+                            f"filtered IP: `{ip}` (matched `{entry}`)", host=host, entry=entry
+                        )
         return None
 
-    def entry_add(self, input: str) -> Union[bool, str]:
+    def _validate_entry(self, input: str) -> Optional[str]:
         try:
             # try to parse input as IP/CIDR
-            net = IPv4Network(input)
+            IPv4Network(input)
         except ValueError as e:
             return str(e)
+        return None
 
-        # add to _networks if not already in list
-        if (r := super().entry_add(input)) is True:
-            self._networks.add(net)
-        return r
-
-    def entry_remove(self, input: str) -> bool:
-        # remove from _networks if previously in list
-        if (r := super().entry_remove(input)) is True:
-            self._networks.remove(IPv4Network(input))
-        return r
+    def _compile_entry(self, entry: str) -> Tuple[str, IPv4Network]:
+        # keep the original entry, `str(network)` isn't necessarily the same (e.g. `/32` suffix)
+        return entry, IPv4Network(entry)
+
+    async def _prepare_match(self, context: CheckContext) -> List[Tuple[str, List[str]]]:
+        # usually already cached, since the actual check ran before
+        ip_groups: List[List[str]] = await asyncio.gather(*map(self.resolve, context.hosts))
+        return list(zip(context.hosts, ip_groups))
+
+    def _match_entry(
+        self,
+        compiled: Tuple[str, IPv4Network],
+        context: CheckContext,
+        prepared: List[Tuple[str, List[str]]],
+    ) -> Optional[CheckResult]:
+        entry, net = compiled
+        for host, ips in prepared:
+            for ip in ips:
+                if IPv4Address(ip) in net:
+                    return CheckResult(
+                        f"filtered IP: `{ip}` (matched `{entry}`)", host=host, entry=entry
+                    )
+        return None
 
-    def _load_list(self) -> None:
-        super()._load_list()
+    def memory_usage(self) -> Dict[str, Any]:
+        return {
+            **super().memory_usage(),
+            "networks": self._snapshot.index,
+            "dns_cache": self._cache,
+        }
 
+    def _build_index(self, entries: Tuple[str, ...]) -> Tuple[Tuple[str, IPv4Network], ...]:
         # convert all read strings into network objects
-        self._networks.update(map(IPv4Network, self))
+        return tuple(map(self._compile_entry, entries))
+
+    def _index_add(
+        self, index: Tuple[Tuple[str, IPv4Network], ...], entries: Tuple[str, ...], added: List[str]
+    ) -> Tuple[Tuple[str, IPv4Network], ...]:
+        return (*index, *map(self._compile_entry, added))
+
+    def _index_remove(
+        self,
+        index: Tuple[Tuple[str, IPv4Network], ...],
+        entries: Tuple[str, ...],
+        removed: List[str],
+    ) -> Tuple[Tuple[str, IPv4Network], ...]:
+        removed_set = set(removed)
+        return tuple((e, n) for e, n in index if e not in removed_set)
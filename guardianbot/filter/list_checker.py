@@ -1,15 +1,51 @@
-from typing import Optional
+import functools
+from typing import Any, Dict, List, Optional, Tuple
 
 from ._base import CheckContext, CheckResult, ManualBaseChecker
+from .normalize import normalize_text
 
 __all__ = ["ListChecker"]
 
 
+class _Needles:
+    def __init__(self, entries: Tuple[str, ...]):
+        self.entries = entries
+
+    @functools.cached_property
+    def normalized(self) -> List[Tuple[str, str]]:
+        # (entry, normalized entry); only built if matching against the normalized text
+        return [(s, normalize_text(s)) for s in self.entries]
+
+
 class ListChecker(ManualBaseChecker):
     def __init__(self):
         super().__init__("blocklist.json")
 
     async def check_match(self, context: CheckContext) -> Optional[CheckResult]:
-        if match := next((s for s in self if s in context.string), None):
-            return CheckResult(f"filtered string: `{match}`")
+        needles: _Needles = self._snapshot.index
+        if self.match_normalized:
+            text = context.normalized
+            match = next((s for s, n in needles.normalized if n in text), None)
+        else:
+            match = next((s for s in needles.entries if s in context.string), None)
+
+        if match:
+            return CheckResult(f"filtered string: `{match}`", entry=match)
         return None
+
+    def _match_entry(
+        self, compiled: str, context: CheckContext, prepared: None
+    ) -> Optional[CheckResult]:
+        needle = normalize_text(compiled) if self.match_normalized else compiled
+        if needle in self._text(context):
+            return CheckResult(f"filtered string: `{compiled}`", entry=compiled)
+        return None
+
+    def memory_usage(self) -> Dict[str, Any]:
+        return {
+            **super().memory_usage(),
+            "normalized": self._snapshot.index.__dict__.get("normalized"),
+        }
+
+    def _build_index(self, entries: Tuple[str, ...]) -> _Needles:
+        return _Needles(entries)
@@ -1,25 +1,100 @@
 import re
-from typing import Optional, Union
+from typing import Any, Dict, List, Optional, Pattern, Tuple
 
-from ._base import CheckContext, CheckResult, ManualBaseChecker
+from . import regex_cost
+from ._base import AdmissionResult, CheckContext, CheckResult, ManualBaseChecker
 
 __all__ = ["RegexChecker"]
 
+_FLAGS = re.MULTILINE
+
 
 class RegexChecker(ManualBaseChecker):
-    def __init__(self):
-        super().__init__("blocklist_regex.json")
+    def __init__(self, cache_name: str = "blocklist_regex.json"):
+        super().__init__(cache_name)
+
+    @staticmethod
+    def _compile(input: str) -> Pattern[str]:
+        return re.compile(input, _FLAGS)
+
+    # overridden methods
 
     async def check_match(self, context: CheckContext) -> Optional[CheckResult]:
-        for r in self:
-            if match := re.search(r, context.string, re.MULTILINE):
-                return CheckResult(f"filtered string: `{match.group()}` (regex: `{r}`)")
+        text = self._text(context)
+        patterns: Tuple[Tuple[str, Pattern[str]], ...] = self._snapshot.index
+        for r, pattern in patterns:
+            if match := pattern.search(text):
+                return CheckResult(f"filtered string: `{match.group()}` (regex: `{r}`)", entry=r)
         return None
 
-    def entry_add(self, input: str) -> Union[bool, str]:
+    def _validate_entry(self, input: str) -> Optional[str]:
         try:
-            re.compile(input)
+            self._compile(input)
         except re.error as e:
             return str(e)
+        return None
+
+    async def check_admission(self, input: str) -> AdmissionResult:
+        return (await self.check_admission_many([input]))[input]
+
+    async def check_admission_many(self, inputs: List[str]) -> Dict[str, AdmissionResult]:
+        # invalid entries get rejected when adding them
+        valid = [i for i in inputs if self._validate_entry(i) is None]
+        costs = await regex_cost.estimate_costs(valid, _FLAGS)
+        results = {i: AdmissionResult() for i in inputs}
+        results.update((i, self._admission_result(cost)) for i, cost in zip(valid, costs))
+        return results
+
+    @staticmethod
+    def _admission_result(cost: regex_cost.RegexCost) -> AdmissionResult:
+        res = AdmissionResult(warnings=cost.warnings)
+        worst = repr(cost.worst_input[:30] + "...") if cost.worst_input else "-"
+        if cost.timed_out:
+            res.error = (
+                f"pattern didn't finish within {regex_cost.WORKER_TIMEOUT}s (input: {worst})"
+            )
+        elif cost.max_time > regex_cost.REJECT_BUDGET:
+            res.error = (
+                f"pattern took {cost.max_time * 1000:.1f}ms on a single input, over the budget of"
+                f" {regex_cost.REJECT_BUDGET * 1000:.0f}ms (input: {worst})"
+            )
+        elif cost.max_time > regex_cost.WARN_BUDGET:
+            res.warnings.append(f"slow on some inputs ({cost.max_time * 1000:.1f}ms)")
+        return res
+
+    def _compile_entry(self, entry: str) -> Pattern[str]:
+        return self._compile(entry)
+
+    def _match_entry(
+        self, compiled: Pattern[str], context: CheckContext, prepared: None
+    ) -> Optional[CheckResult]:
+        if match := compiled.search(self._text(context)):
+            return CheckResult(
+                f"filtered string: `{match.group()}` (regex: `{compiled.pattern}`)",
+                entry=compiled.pattern,
+            )
+        return None
+
+    def memory_usage(self) -> Dict[str, Any]:
+        return {**super().memory_usage(), "patterns": self._snapshot.index}
+
+    def _build_index(self, entries: Tuple[str, ...]) -> Tuple[Tuple[str, Pattern[str]], ...]:
+        # precompile all patterns once, instead of relying on `re`'s (small) internal cache
+        return tuple((r, self._compile(r)) for r in entries)
+
+    def _index_add(
+        self,
+        index: Tuple[Tuple[str, Pattern[str]], ...],
+        entries: Tuple[str, ...],
+        added: List[str],
+    ) -> Tuple[Tuple[str, Pattern[str]], ...]:
+        return (*index, *((r, self._compile(r)) for r in added))
 
-        return super().entry_add(input)
+    def _index_remove(
+        self,
+        index: Tuple[Tuple[str, Pattern[str]], ...],
+        entries: Tuple[str, ...],
+        removed: List[str],
+    ) -> Tuple[Tuple[str, Pattern[str]], ...]:
+        removed_set = set(removed)
+        return tuple((r, p) for r, p in index if r not in removed_set)
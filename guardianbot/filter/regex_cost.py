@@ -0,0 +1,285 @@
+"""
+Estimates the matching cost of regular expressions, by statically looking for constructs
+that are prone to catastrophic backtracking, and by timing the pattern against adversarial
+and sample inputs in a separate process.
+
+Only depends on the standard library, since this file is also executed as the worker script.
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import string
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Any, List, Optional, Sequence, Set
+
+try:
+    from re import _parser as sre_parse  # type: ignore  # 3.11+
+except ImportError:  # pragma: no cover
+    import sre_parse  # type: ignore
+
+# inputs longer than the maximum message length aren't realistic
+INPUT_LENGTH = 2000
+# warn about / reject patterns taking longer than this on a single input, in seconds
+WARN_BUDGET = 0.005
+REJECT_BUDGET = 0.05
+# total time a single pattern may take on all inputs; measured from when the pattern is sent
+# to the worker, so this doesn't include the worker startup
+WORKER_TIMEOUT = 3.0
+# maximum number of worker processes when estimating multiple patterns at once
+POOL_SIZE = min(4, os.cpu_count() or 1)
+
+_MAXREPEAT: int = sre_parse.MAXREPEAT
+_REPEATS = {"MAX_REPEAT", "MIN_REPEAT"}
+_CATEGORY_CHARS = {
+    "CATEGORY_DIGIT": string.digits,
+    "CATEGORY_WORD": string.ascii_letters + string.digits + "_",
+    "CATEGORY_SPACE": " \t\n",
+}
+_SAMPLE_WORDS = (
+    "hey what's up check this out free nitro giveaway https://discord.gg/abc123 lol "
+    "anyone here play the new update?? :) <@123456789012345678> steam gift card "
+    "https://example.com/path/to/page?query=1&x=2 ok thanks"
+).split()
+
+
+@dataclass
+class RegexCost:
+    # risky constructs found by the static analysis
+    warnings: List[str] = field(default_factory=list)
+    # maximum time on a single input, in seconds
+    max_time: float = 0
+    # input that took the longest (or that didn't finish in time)
+    worst_input: Optional[str] = None
+    timed_out: bool = False
+
+
+# static analysis
+
+
+def _walk(items: Any, in_repeat: bool, warnings: Set[str]) -> None:
+    for op, av in items:
+        name = op.name
+        if name in _REPEATS:
+            lo, hi, sub = av
+            unbounded = hi == _MAXREPEAT
+            if unbounded and in_repeat:
+                warnings.add("nested quantifiers (unbounded repetition inside another one)")
+            _walk(sub, in_repeat or unbounded, warnings)
+        elif name == "SUBPATTERN":
+            _walk(av[-1], in_repeat, warnings)
+        elif name == "BRANCH":
+            branches = av[1]
+            if in_repeat and _branches_overlap(branches):
+                warnings.add("overlapping alternatives inside a repetition")
+            for branch in branches:
+                _walk(branch, in_repeat, warnings)
+        elif name in ("ASSERT", "ASSERT_NOT"):
+            _walk(av[1], in_repeat, warnings)
+        elif name == "GROUPREF_EXISTS":
+            _walk(av[1], in_repeat, warnings)
+            if av[2] is not None:
+                _walk(av[2], in_repeat, warnings)
+        # atomic groups and possessive repeats don't backtrack, and are skipped intentionally
+
+
+def _first_chars(items: Any) -> Optional[Set[str]]:
+    """Returns the set of possible first characters, or None if unknown/arbitrary"""
+    for op, av in items:
+        name = op.name
+        if name == "AT":
+            continue
+        if name == "LITERAL":
+            return {chr(av)}
+        if name == "IN":
+            chars: Set[str] = set()
+            for iop, iav in av:
+                if iop.name == "LITERAL":
+                    chars.add(chr(iav))
+                elif iop.name == "RANGE" and iav[1] - iav[0] < 256:
+                    chars.update(map(chr, range(iav[0], iav[1] + 1)))
+                elif iop.name == "CATEGORY" and iav.name in _CATEGORY_CHARS:
+                    chars.update(_CATEGORY_CHARS[iav.name])
+                else:
+                    return None
+            return chars
+        if name == "SUBPATTERN":
+            return _first_chars(av[-1])
+        if name in _REPEATS and av[0] > 0:
+            return _first_chars(av[2])
+        return None
+    return None
+
+
+def _branches_overlap(branches: Sequence[Any]) -> bool:
+    seen: Set[str] = set()
+    for branch in branches:
+        chars = _first_chars(branch)
+        if chars is None or chars & seen:
+            return True
+        seen |= chars
+    return False
+
+
+def find_risky_constructs(pattern: str, flags: int = 0) -> List[str]:
+    warnings: Set[str] = set()
+    _walk(sre_parse.parse(pattern, flags), False, warnings)
+    return sorted(warnings)
+
+
+# inputs
+
+
+def _representative(items: Any) -> str:
+    """Returns a short string resembling what the given items would match"""
+    out: List[str] = []
+    for op, av in items:
+        name = op.name
+        if name == "LITERAL":
+            out.append(chr(av))
+        elif name in ("IN", "NOT_LITERAL", "ANY"):
+            chars = _first_chars([(op, av)]) if name == "IN" else None
+            out.append(min(chars) if chars else "a")
+        elif name in _REPEATS or name == "POSSESSIVE_REPEAT":
+            out.append(_representative(av[2]) * max(av[0], 1))
+        elif name in ("SUBPATTERN", "ATOMIC_GROUP"):
+            out.append(_representative(av[-1] if name == "SUBPATTERN" else av))
+        elif name == "BRANCH":
+            out.append(_representative(av[1][0]))
+    return "".join(out)
+
+
+def adversarial_inputs(pattern: str, flags: int = 0) -> List[str]:
+    """
+    Builds inputs that match a prefix of the pattern, followed by many repetitions
+    of each repeated part, and end in a character that (likely) doesn't match
+    """
+    items = list(sre_parse.parse(pattern, flags))
+    inputs: List[str] = []
+    for i, (op, av) in enumerate(items):
+        if op.name not in _REPEATS and op.name != "SUBPATTERN":
+            continue
+        sub = av[2] if op.name in _REPEATS else av[-1]
+        if not (pump := _representative(sub)):
+            continue
+        prefix = _representative(items[:i])
+        count = max((INPUT_LENGTH - len(prefix)) // len(pump), 1)
+        inputs.append(prefix + pump * count + "\0")
+
+    # repetitions of all characters in the pattern
+    chars = sorted(set(_representative(items)))[:20]
+    inputs.extend(c * INPUT_LENGTH + "\0" for c in chars)
+    if chars:
+        inputs.append("".join(itertools.islice(itertools.cycle(chars), INPUT_LENGTH)) + "\0")
+    return inputs
+
+
+def sample_inputs() -> List[str]:
+    """Inputs resembling regular messages of various lengths"""
+    words = itertools.cycle(_SAMPLE_WORDS)
+    return [" ".join(itertools.islice(words, n))[:INPUT_LENGTH] for n in (5, 50, 400)]
+
+
+# timing
+
+
+def _worker() -> None:
+    import re
+
+    # one pattern per line, answered with one timing per input
+    for line in sys.stdin:
+        data = json.loads(line)
+        compiled = re.compile(data["pattern"], data["flags"])
+        for s in data["inputs"]:
+            start = time.perf_counter()
+            compiled.search(s)
+            print(time.perf_counter() - start, flush=True)
+
+
+class _Worker:
+    """Worker process timing patterns one after another, to avoid paying the startup per pattern"""
+
+    def __init__(self, proc: "asyncio.subprocess.Process"):
+        self._proc = proc
+
+    @classmethod
+    async def start(cls) -> "_Worker":
+        proc = await asyncio.create_subprocess_exec(
+            sys.executable,
+            "-I",
+            __file__,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        return cls(proc)
+
+    async def measure(self, pattern: str, flags: int, inputs: List[str], cost: RegexCost) -> bool:
+        """
+        Times the pattern against the inputs; returns False if it didn't finish in time,
+        in which case the worker is still busy and can't be used anymore
+        """
+        proc = self._proc
+        assert proc.stdin and proc.stdout
+        line = json.dumps({"pattern": pattern, "flags": flags, "inputs": inputs})
+        proc.stdin.write(line.encode() + b"\n")
+        await proc.stdin.drain()
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + WORKER_TIMEOUT
+        for s in inputs:
+            try:
+                line = await asyncio.wait_for(proc.stdout.readline(), deadline - loop.time())
+            except asyncio.TimeoutError:
+                cost.timed_out = True
+                cost.worst_input = s
+                return False
+            if not line:
+                raise RuntimeError("regex cost worker exited unexpectedly")
+            if (t := float(line)) > cost.max_time:
+                cost.max_time, cost.worst_input = t, s
+        return True
+
+    async def close(self) -> None:
+        if self._proc.returncode is None:
+            self._proc.kill()
+        await self._proc.wait()
+
+
+async def estimate_costs(patterns: Sequence[str], flags: int = 0) -> List[RegexCost]:
+    """
+    Estimates the cost of multiple (valid) patterns; the timing runs in a small pool
+    of worker processes, which are only replaced if a pattern times out
+    """
+    costs = [RegexCost(warnings=find_risky_constructs(p, flags)) for p in patterns]
+    # shared between all workers, each one takes the next pattern once it's done
+    jobs = iter(enumerate(patterns))
+
+    async def run() -> None:
+        worker: Optional[_Worker] = None
+        try:
+            for i, pattern in jobs:
+                if worker is None:
+                    worker = await _Worker.start()
+                inputs = [*adversarial_inputs(pattern, flags), *sample_inputs()]
+                if not await worker.measure(pattern, flags, inputs, costs[i]):
+                    await worker.close()
+                    worker = None
+        finally:
+            if worker is not None:
+                await worker.close()
+
+    await asyncio.gather(*(run() for _ in range(min(POOL_SIZE, len(patterns)))))
+    return costs
+
+
+async def estimate_cost(pattern: str, flags: int = 0) -> RegexCost:
+    """Estimates the cost of a (valid) pattern; the timing runs in a separate process"""
+    return (await estimate_costs([pattern], flags))[0]
+
+
+if __name__ == "__main__":
+    _worker()
@@ -0,0 +1,136 @@
+import asyncio
+import functools
+import json
+import time
+from dataclasses import asdict, dataclass, field
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Generic,
+    Iterator,
+    List,
+    Optional,
+    TypeVar,
+)
+
+from .. import persistence, storage
+
+if TYPE_CHECKING:
+    from ._base import CheckContext, CheckResult
+
+__all__ = ["ShadowStats", "ShadowEntries"]
+
+# stats are written at most once per minute
+FLUSH_INTERVAL = 60
+# number of example messages to keep per entry
+MAX_EXAMPLES = 5
+
+_T = TypeVar("_T")
+
+
+@dataclass
+class ShadowStats:
+    # unix timestamp of when the entry was added
+    added: int
+    # number of messages the entry was evaluated on
+    evaluated: int = 0
+    # number of messages that would have been blocked
+    hits: int = 0
+    # total time spent evaluating the entry, in seconds
+    time: float = 0
+    last_hit: Optional[int] = None
+    # jump URL and content of the most recent hits
+    examples: List[str] = field(default_factory=list)
+
+    @property
+    def cost_us(self) -> float:
+        """Average time per message, in microseconds"""
+        return self.time / self.evaluated * 1e6 if self.evaluated else 0
+
+
+class ShadowEntries(Generic[_T]):
+    """
+    Entries of a list that are evaluated on all messages, but never enforced;
+    only the would-be hits and the evaluation time of each entry are recorded.
+    """
+
+    def __init__(self, backend: storage.Storage, list_name: str, compile: Callable[[str], _T]):
+        self._name = f"{list_name}.shadow"
+        self._compile = compile
+
+        self._stats: Dict[str, ShadowStats] = {}
+        self._compiled: Dict[str, _T] = {}
+        if raw := backend.load_state(self._name):
+            for entry, stats in json.loads(raw).items():
+                self._stats[entry] = ShadowStats(**stats)
+                self._compiled[entry] = compile(entry)
+
+        self._writer = persistence.DebouncedWriter(
+            self._name,
+            lambda: json.dumps({e: asdict(s) for e, s in self._stats.items()}),
+            functools.partial(backend.save_state, self._name),
+            delay=FLUSH_INTERVAL,
+        )
+
+    def add(self, entry: str) -> None:
+        self._compiled[entry] = self._compile(entry)
+        self._stats[entry] = ShadowStats(int(time.time()))
+        self._writer.schedule()
+
+    def remove(self, entry: str) -> Optional[ShadowStats]:
+        self._compiled.pop(entry, None)
+        stats = self._stats.pop(entry, None)
+        self._writer.schedule()
+        return stats
+
+    def get(self, entry: str) -> Optional[ShadowStats]:
+        return self._stats.get(entry)
+
+    async def evaluate(
+        self,
+        context: "CheckContext",
+        prepare: Callable[["CheckContext"], Awaitable[Any]],
+        match: Callable[[_T, "CheckContext", Any], Optional["CheckResult"]],
+    ) -> None:
+        if not self._compiled:
+            return
+        # I/O (e.g. DNS lookups) happens once beforehand, and isn't attributed to any entry
+        prepared = await prepare(context)
+        for entry, compiled in list(self._compiled.items()):
+            start = time.perf_counter()
+            result = match(compiled, context, prepared)
+            elapsed = time.perf_counter() - start
+
+            if (stats := self._stats.get(entry)) is None:
+                # removed in the meantime
+                continue
+            stats.evaluated += 1
+            stats.time += elapsed
+            if result:
+                stats.hits += 1
+                stats.last_hit = int(time.time())
+                example = f"{context.message.jump_url} {context.string[:200]!r}"
+                stats.examples = [*stats.examples[-(MAX_EXAMPLES - 1) :], example]
+
+            # don't block the loop for too long with many shadow entries
+            await asyncio.sleep(0)
+
+        self._writer.schedule()
+
+    async def flush(self) -> None:
+        await self._writer.flush()
+
+    def flush_sync(self) -> None:
+        self._writer.flush_sync()
+
+    def __len__(self) -> int:
+        return len(self._stats)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._stats
+
+    def __contains__(self, obj: Any) -> bool:
+        return obj in self._stats
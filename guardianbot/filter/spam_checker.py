@@ -1,15 +1,15 @@
 import itertools
 import logging
-import re
 from collections import defaultdict
 from datetime import datetime, timedelta
-from typing import Dict, Iterable, List, Optional, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Pattern, Tuple
 
 import disnake
 import pydantic
 
 from .. import utils
-from ._base import CheckContext, CheckResult, ManualBaseChecker
+from ._base import CheckContext, CheckResult
+from .regex_checker import RegexChecker
 
 logger = logging.getLogger(__name__)
 
@@ -21,7 +21,7 @@ class SpamCheckerConfig(utils.StrictModel):
     repeat_count: pydantic.PositiveInt = 2
 
 
-class SpamChecker(ManualBaseChecker):
+class SpamChecker(RegexChecker):
     def __init__(self, config: SpamCheckerConfig):
         super().__init__("blocklist_spam.json")
         self.config = config
@@ -53,13 +53,15 @@ class SpamChecker(ManualBaseChecker):
                 logger.debug(f"cleaned {dropped} history entries")
             self.__last_clear = created
 
-        for r in self:
-            if match := re.search(r, context.string, re.MULTILINE):
+        text = self._text(context)
+        patterns: Tuple[Tuple[str, Pattern[str]], ...] = self._snapshot.index
+        for r, pattern in patterns:
+            if match := pattern.search(text):
                 author = context.message.author
 
-                hist = self.history[(author.id, context.string)]
+                hist = self.history[(author.id, text)]
                 logger.debug(
-                    f"detected potential spam by {str(author)}/{author.id}: '{context.string}'"
+                    f"detected potential spam by {str(author)}/{author.id}: '{text}'"
                     f" (previous times: {[m.created_at.replace(microsecond=0).isoformat() for m in hist]})"
                 )
 
@@ -75,12 +77,17 @@ class SpamChecker(ManualBaseChecker):
                     diff = (created - hist[0].created_at).seconds
                     logger.debug(f"{self.config.repeat_count} messages within {diff} seconds")
                     return CheckResult(
-                        f"detected spam: `{match.group()}` (regex: `{r}`)", messages=hist[::-1]
+                        f"detected spam: `{match.group()}` (regex: `{r}`)",
+                        entry=r,
+                        messages=hist[::-1],
                     )
 
                 break  # don't continue searching since spam detection is based on message content, not the specific regex that matched
         return None
 
+    def memory_usage(self) -> Dict[str, Any]:
+        return {**super().memory_usage(), "history": self.history}
+
     @staticmethod
     def __clean_history(
         history: List[disnake.PartialMessage], min_time: datetime
@@ -0,0 +1,184 @@
+import asyncio
+import ctypes
+import ctypes.util
+import logging
+import os
+import struct
+import sys
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple
+
+from ._base import BaseChecker
+
+__all__ = ["ListWatcher"]
+
+logger = logging.getLogger(__name__)
+
+# see inotify(7)
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_EVENT_HEADER = struct.Struct("iIII")
+
+
+class _Inotify:
+    """Minimal ctypes wrapper around the inotify API, watching a single directory"""
+
+    def __init__(self, path: str):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd: int = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        wd = libc.inotify_add_watch(
+            self.fd, os.fsencode(path), _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+        )
+        if wd < 0:
+            err = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(err, f"inotify_add_watch failed for '{path}'")
+
+    def read_names(self) -> Set[str]:
+        """Returns names of all files with pending events"""
+        names: Set[str] = set()
+        while True:
+            try:
+                buf = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return names
+            offset = 0
+            while offset < len(buf):
+                _, _, _, name_len = _IN_EVENT_HEADER.unpack_from(buf, offset)
+                offset += _IN_EVENT_HEADER.size
+                names.add(os.fsdecode(buf[offset : offset + name_len].rstrip(b"\0")))
+                offset += name_len
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class ListWatcher:
+    """
+    Watches the list files of the given checkers for external changes, and reloads them.
+
+    Uses inotify if available (Linux), and falls back to polling modification times otherwise.
+    """
+
+    def __init__(
+        self,
+        checkers: Iterable[BaseChecker],
+        *,
+        on_error: Optional[Callable[[Exception], Awaitable[None]]] = None,
+        poll_interval: float = 5,
+        debounce: float = 0.5,
+    ):
+        self._checkers: Dict[str, BaseChecker] = {
+            os.path.abspath(c.cache_path): c for c in checkers
+        }
+        self._on_error = on_error
+        self._poll_interval = poll_interval
+        self._debounce = debounce
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._inotify: Dict[str, _Inotify] = {}
+        self._poll_task: Optional["asyncio.Task[None]"] = None
+        self._changed: Set[str] = set()
+        self._reload_handle: Optional[asyncio.TimerHandle] = None
+        self._reload_tasks: Set["asyncio.Task[None]"] = set()
+
+    def start(self) -> None:
+        self._loop = loop = asyncio.get_running_loop()
+        dirs = {os.path.dirname(p) for p in self._checkers}
+
+        if sys.platform == "linux":
+            try:
+                for d in dirs:
+                    os.makedirs(d, exist_ok=True)
+                    inotify = _Inotify(d)
+                    self._inotify[d] = inotify
+                    loop.add_reader(inotify.fd, self._on_inotify, d)
+                logger.debug(f"watching {len(self._checkers)} list files using inotify")
+                return
+            except (OSError, AttributeError) as e:
+                logger.warning(f"inotify unavailable, falling back to polling: {e}")
+                self._close_inotify()
+
+        logger.debug(f"watching {len(self._checkers)} list files using polling")
+        self._poll_task = loop.create_task(self._poll())
+
+    def stop(self) -> None:
+        self._close_inotify()
+        if self._poll_task:
+            self._poll_task.cancel()
+            self._poll_task = None
+        if self._reload_handle:
+            self._reload_handle.cancel()
+            self._reload_handle = None
+        for task in self._reload_tasks:
+            task.cancel()
+
+    def _close_inotify(self) -> None:
+        for inotify in self._inotify.values():
+            if self._loop and not self._loop.is_closed():
+                self._loop.remove_reader(inotify.fd)
+            inotify.close()
+        self._inotify.clear()
+
+    def _on_inotify(self, dir: str) -> None:
+        paths = {os.path.join(dir, n) for n in self._inotify[dir].read_names()}
+        self._mark_changed(paths & self._checkers.keys())
+
+    async def _poll(self) -> None:
+        def stat_all() -> Dict[str, Optional[Tuple[int, int]]]:
+            res: Dict[str, Optional[Tuple[int, int]]] = {}
+            for path in self._checkers:
+                try:
+                    st = os.stat(path)
+                    res[path] = (st.st_mtime_ns, st.st_size)
+                except FileNotFoundError:
+                    res[path] = None
+            return res
+
+        loop = asyncio.get_running_loop()
+        last = await loop.run_in_executor(None, stat_all)
+        while True:
+            await asyncio.sleep(self._poll_interval)
+            current = await loop.run_in_executor(None, stat_all)
+            self._mark_changed({p for p, s in current.items() if s != last.get(p)})
+            last = current
+
+    def _mark_changed(self, paths: Set[str]) -> None:
+        if not paths:
+            return
+        self._changed |= paths
+        # wait for bursts of events to settle before reloading
+        if self._reload_handle:
+            self._reload_handle.cancel()
+        assert self._loop
+        self._reload_handle = self._loop.call_later(self._debounce, self._start_reload)
+
+    def _start_reload(self) -> None:
+        assert self._loop
+        self._reload_handle = None
+        changed, self._changed = self._changed, set()
+        # keep a reference, otherwise the task may be garbage-collected before it finishes
+        task = self._loop.create_task(self._reload(changed))
+        self._reload_tasks.add(task)
+        task.add_done_callback(self._reload_done)
+
+    def _reload_done(self, task: "asyncio.Task[None]") -> None:
+        self._reload_tasks.discard(task)
+        if not task.cancelled() and (exc := task.exception()) is not None:
+            logger.error("failed reloading list files", exc_info=exc)
+
+    async def _reload(self, changed: Set[str]) -> None:
+        for path in changed:
+            checker = self._checkers[path]
+            logger.debug(f"list file changed: {path}")
+            try:
+                await checker.reload()
+            except Exception as e:
+                if self._on_error is None:
+                    raise
+                try:
+                    await self._on_error(e)
+                except Exception:
+                    logger.exception(f"failed handling error while reloading {path}")
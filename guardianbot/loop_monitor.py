@@ -0,0 +1,129 @@
+import asyncio
+import collections
+import logging
+import sys
+import threading
+import time
+import traceback
+from types import FrameType, TracebackType
+from typing import Awaitable, Callable, Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LoopBlocked(Exception):
+    """Raised (well, reported) if the event loop was blocked; the traceback is the loop thread's"""
+
+    def __init__(self, lag: float, suppressed: int = 0):
+        msg = f"event loop was blocked for {lag * 1000:.0f}ms"
+        if suppressed:
+            msg += f" ({suppressed} more time(s) since the last report)"
+        super().__init__(msg)
+        self.lag = lag
+
+
+def _frame_to_traceback(frame: Optional[FrameType]) -> Optional[TracebackType]:
+    """Turns a (running) frame into a traceback, so it can be formatted like an exception"""
+    tb: Optional[TracebackType] = None
+    while frame is not None:
+        tb = TracebackType(tb, frame, frame.f_lasti, frame.f_lineno or 0)
+        frame = frame.f_back
+    return tb
+
+
+class LoopMonitor:
+    """
+    Continuously measures the event loop's scheduling delay (lag).
+
+    If the loop doesn't respond for longer than the threshold, a watchdog thread captures
+    the stack of the loop thread, which is then reported (throttled) once the loop responds again.
+    """
+
+    def __init__(
+        self,
+        *,
+        threshold: float,
+        on_blocked: Optional[Callable[[LoopBlocked], Awaitable[None]]] = None,
+        interval: float = 0.25,
+        window: int = 1200,
+        report_interval: float = 15 * 60,
+    ):
+        self._threshold = threshold
+        self._on_blocked = on_blocked
+        self._interval = interval
+        self._report_interval = report_interval
+
+        # recent lag samples, in seconds
+        self._samples: Deque[float] = collections.deque(maxlen=window)
+        self._last_tick = time.monotonic()
+        self._task: Optional["asyncio.Task[None]"] = None
+        self._stopped = threading.Event()
+
+        # stack captured by the watchdog, handed over to the loop
+        self._lock = threading.Lock()
+        self._captured: Optional[TracebackType] = None
+        self._last_report = -float("inf")
+        self._suppressed = 0
+
+    def start(self) -> None:
+        self._last_tick = time.monotonic()
+        self._stopped = threading.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        if self._threshold:
+            threading.Thread(
+                target=self._watchdog,
+                args=(threading.get_ident(), self._stopped),
+                name="loop-watchdog",
+                daemon=True,
+            ).start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    def percentiles(self, *quantiles: float) -> Dict[float, float]:
+        samples = sorted(self._samples)
+        if not samples:
+            return {q: 0.0 for q in quantiles}
+        return {q: samples[min(int(q * len(samples)), len(samples) - 1)] for q in quantiles}
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self._interval)
+            lag = max(loop.time() - start - self._interval, 0)
+            self._samples.append(lag)
+            self._last_tick = time.monotonic()
+
+            if self._threshold and lag >= self._threshold:
+                await self._report(lag)
+
+    def _watchdog(self, loop_thread: int, stopped: threading.Event) -> None:
+        while not stopped.wait(self._threshold / 2):
+            if time.monotonic() - self._last_tick < self._threshold + self._interval:
+                continue
+            with self._lock:
+                # only capture once per blocking period, the first stack is usually the relevant one
+                if self._captured is None:
+                    self._captured = _frame_to_traceback(sys._current_frames().get(loop_thread))
+
+    async def _report(self, lag: float) -> None:
+        with self._lock:
+            tb, self._captured = self._captured, None
+
+        stack = "".join(traceback.format_tb(tb)) if tb else "(no stack captured)\n"
+        logger.warning(f"event loop was blocked for {lag * 1000:.0f}ms, at:\n{stack.rstrip()}")
+
+        now = time.monotonic()
+        if now - self._last_report < self._report_interval:
+            self._suppressed += 1
+            return
+        exc = LoopBlocked(lag, self._suppressed).with_traceback(tb)
+        self._last_report = now
+        self._suppressed = 0
+
+        if self._on_blocked:
+            await self._on_blocked(exc)
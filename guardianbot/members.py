@@ -0,0 +1,54 @@
+import collections
+import logging
+from typing import Callable, Optional
+
+import disnake
+
+logger = logging.getLogger(__name__)
+
+
+class MemberCache:
+    """
+    Looks up members in the guild's member cache, falling back to a small LRU cache
+    of members fetched on demand; used if disnake's member cache is disabled.
+    """
+
+    def __init__(self, get_guild: Callable[[], disnake.Guild], *, size: int = 1000):
+        self._get_guild = get_guild
+        self._size = size
+        self._members: "collections.OrderedDict[int, disnake.Member]" = collections.OrderedDict()
+
+    def get(self, user_id: int) -> Optional[disnake.Member]:
+        if member := self._get_guild().get_member(user_id):
+            return member
+        if member := self._members.get(user_id):
+            self._members.move_to_end(user_id)
+        return member
+
+    async def fetch(self, user_id: int) -> Optional[disnake.Member]:
+        if member := self.get(user_id):
+            return member
+        try:
+            member = await self._get_guild().fetch_member(user_id)
+        except disnake.NotFound:
+            return None
+        logger.debug(f"fetched member {member}/{member.id}")
+        self._store(member)
+        return member
+
+    def update(self, member: disnake.Member) -> None:
+        """Replaces the cached member, if it's cached"""
+        if member.id in self._members:
+            self._store(member)
+
+    def remove(self, user_id: int) -> None:
+        self._members.pop(user_id, None)
+
+    def _store(self, member: disnake.Member) -> None:
+        self._members[member.id] = member
+        self._members.move_to_end(member.id)
+        while len(self._members) > self._size:
+            self._members.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._members)
@@ -0,0 +1,174 @@
+import asyncio
+import collections
+import gc
+import sys
+import tracemalloc
+import types
+from dataclasses import dataclass
+from typing import Any, Collection, Iterable, Iterator, List, Optional, Set, Tuple
+
+# stop walking a single object graph after this many objects
+MAX_OBJECTS = 200_000
+# stop walking after this many objects in total, across all measured items
+MAX_TOTAL_OBJECTS = 1_000_000
+# yield to the event loop after walking this many objects, to keep it responsive
+YIELD_INTERVAL = 10_000
+
+# objects of these types are counted, but never traversed
+_OPAQUE_TYPES = (
+    type,
+    types.ModuleType,
+    types.FunctionType,
+    types.BuiltinFunctionType,
+    types.MethodType,
+    types.FrameType,
+    types.CodeType,
+    str,
+    bytes,
+    bytearray,
+    int,
+    float,
+)
+
+
+@dataclass
+class SizeInfo:
+    name: str
+    # number of entries, if it's a collection
+    count: Optional[int]
+    # approximate size in bytes, including referenced objects
+    size: int
+    # whether the object graph was too large to be walked completely
+    truncated: bool = False
+
+
+def _referents(obj: Any) -> Iterator[Any]:
+    if isinstance(obj, dict):
+        for k, v in obj.items():  # pyright: ignore
+            yield k
+            yield v
+    elif isinstance(obj, (list, tuple, set, frozenset, collections.deque)):
+        yield from obj  # pyright: ignore
+    else:
+        if (d := getattr(obj, "__dict__", None)) is not None:
+            yield d
+        for cls in type(obj).__mro__:
+            for slot in getattr(cls, "__slots__", ()):
+                if isinstance(slot, str) and (v := getattr(obj, slot, None)) is not None:
+                    yield v
+
+
+async def deep_sizeof(obj: Any, seen: Set[int], limit: int = MAX_OBJECTS) -> Tuple[SizeInfo, int]:
+    """
+    Approximates the size of an object, including all objects it references.
+    Returns the size and the number of walked objects.
+
+    Objects in `seen` are skipped; it can be pre-filled with shared objects
+    (e.g. the client), so they aren't attributed to every structure referencing them.
+    """
+    size = 0
+    walked = 0
+    stack = [obj]
+    while stack:
+        o = stack.pop()
+        if id(o) in seen:
+            continue
+        seen.add(id(o))
+        size += sys.getsizeof(o, 0)
+        walked += 1
+        if walked >= limit:
+            return SizeInfo("", None, size, truncated=True), walked
+        if not isinstance(o, _OPAQUE_TYPES):
+            # referents are collected at once, so containers can't change while being iterated
+            stack.extend(_referents(o))
+        if walked % YIELD_INTERVAL == 0:
+            await asyncio.sleep(0)
+    return SizeInfo("", None, size), walked
+
+
+async def measure(
+    items: Iterable[Any], *, exclude: Iterable[Any] = (), total_limit: int = MAX_TOTAL_OBJECTS
+) -> List[SizeInfo]:
+    """
+    Measures the given (name, object) pairs; objects in `exclude` are never traversed.
+    Periodically yields to the event loop, and stops walking after `total_limit` objects.
+    """
+    seen = {id(o) for o in exclude}
+    remaining = total_limit
+    result: List[SizeInfo] = []
+    for name, obj in items:
+        if remaining > 0:
+            info, walked = await deep_sizeof(obj, seen, min(MAX_OBJECTS, remaining))
+            remaining -= walked
+        else:
+            info = SizeInfo("", None, 0, truncated=True)
+        info.name = name
+        info.count = len(obj) if isinstance(obj, Collection) else None
+        result.append(info)
+        await asyncio.sleep(0)
+    return result
+
+
+def process_rss() -> Optional[int]:
+    """Returns the resident set size of the current process in bytes, if available"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def gc_object_count() -> int:
+    return len(gc.get_objects())
+
+
+# tracemalloc
+
+
+_TRACE_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+_last_snapshot: Optional[tracemalloc.Snapshot] = None
+
+
+def start_tracing(frames: int = 1) -> None:
+    global _last_snapshot
+    _last_snapshot = None
+    tracemalloc.start(frames)
+
+
+def stop_tracing() -> None:
+    global _last_snapshot
+    _last_snapshot = None
+    tracemalloc.stop()
+
+
+def take_snapshot() -> tracemalloc.Snapshot:
+    """Takes a new snapshot, which is also used as the base of the next diff"""
+    global _last_snapshot
+    _last_snapshot = tracemalloc.take_snapshot().filter_traces(_TRACE_FILTERS)
+    return _last_snapshot
+
+
+def top_allocations(snapshot: tracemalloc.Snapshot, limit: int) -> List[str]:
+    stats = snapshot.statistics("lineno")
+    return [str(s) for s in stats[:limit]]
+
+
+def diff_allocations(limit: int) -> Optional[List[str]]:
+    """
+    Compares a new snapshot against the previous one, returning the largest differences;
+    returns None if there is no previous snapshot (a new one is taken either way)
+    """
+    previous = _last_snapshot
+    current = take_snapshot()
+    if previous is None:
+        return None
+    stats = current.compare_to(previous, "lineno")
+    return [str(s) for s in stats[:limit]]
@@ -0,0 +1,187 @@
+import bisect
+import contextlib
+import logging
+import math
+import time
+from typing import Callable, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+_LabelValues = Tuple[str, ...]
+GaugeValue = Union[float, Mapping[_LabelValues, float]]
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], **extra: str) -> str:
+    pairs = [*zip(names, values), *extra.items()]
+    if not pairs:
+        return ""
+    escaped = (
+        (k, v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')) for k, v in pairs
+    )
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    type: str
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        REGISTRY[name] = self
+
+    def _label_values(self, labels: Mapping[str, str]) -> _LabelValues:
+        assert labels.keys() == set(self.labelnames), f"invalid labels for {self.name}: {labels}"
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[_LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._label_values(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels: str) -> float:
+        return self._values.get(self._label_values(labels), 0)
+
+    def items(self) -> Iterator[Tuple[Dict[str, str], float]]:
+        """Yields the labels and value of each time series"""
+        for key, value in self._values.items():
+            yield dict(zip(self.labelnames, key)), value
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        for key, value in self._values.items():
+            lines.append(
+                f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            )
+        return lines
+
+
+class Gauge(_Metric):
+    """Gauge with a value computed on demand, either a single number or a mapping of label values"""
+
+    type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        func: Callable[[], GaugeValue],
+        labelnames: Sequence[str] = (),
+    ):
+        super().__init__(name, help, labelnames)
+        self._func = func
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        value = self._func()
+        values = value if isinstance(value, Mapping) else {(): value}
+        for key, v in values.items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}")
+        return lines
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help, labelnames)
+        self._buckets = tuple(sorted(buckets))
+        # label values -> (bucket counts, sum)
+        self._values: Dict[_LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._label_values(labels)
+        if (v := self._values.get(key)) is None:
+            v = self._values[key] = ([0] * (len(self._buckets) + 1), [0.0])
+        counts, total = v
+        counts[bisect.bisect_left(self._buckets, value)] += 1
+        total[0] += value
+
+    @contextlib.contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        for key, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip((*self._buckets, math.inf), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, le=_format_value(bound))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total[0])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+# metric name -> metric; re-registering a name (e.g. when reloading a cog) replaces the old metric
+REGISTRY: Dict[str, _Metric] = {}
+
+
+def render() -> str:
+    lines: List[str] = []
+    for metric in list(REGISTRY.values()):
+        try:
+            lines.extend(metric.render())
+        except Exception:
+            logger.exception(f"failed rendering metric {metric.name}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """Serves all registered metrics in the Prometheus text format on `/metrics`"""
+
+    def __init__(self, host: str, port: int):
+        self._host = host
+        self._port = port
+        self._runner: Optional[web.AppRunner] = None
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self._host, self._port).start()
+        logger.info(f"serving metrics on http://{self._host}:{self._port}/metrics")
+
+    async def stop(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        return web.Response(
+            body=render().encode(),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+        )
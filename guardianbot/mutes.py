@@ -0,0 +1,108 @@
+import heapq
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import disnake
+
+
+class MutedRegistry:
+    """
+    Keeps track of muted members, either by role (permanent) or by timeout.
+
+    Timeouts are additionally kept in a min-heap by expiry; expired timeouts are
+    pruned lazily when reading, so lookups only ever touch muted members.
+    """
+
+    def __init__(self, role_id: Optional[int]):
+        self._role_id = role_id
+        self._role: Set[int] = set()
+        self._timeouts: Dict[int, datetime] = {}
+        # (expiry, member ID); may contain outdated entries, which are skipped when pruning
+        self._heap: List[Tuple[datetime, int]] = []
+        # IDs of members changed while filling the registry from a (slow) member fetch
+        self._changed: Optional[Set[int]] = None
+
+    def rebuild(self, members: Iterable[disnake.Member]) -> None:
+        self.clear()
+        for member in members:
+            self.update(member)
+
+    def start_fill(self) -> None:
+        """Starts tracking changed members, so that `fill` doesn't overwrite newer state"""
+        self._changed = set()
+
+    def fill(self, member: disnake.Member) -> None:
+        """Adds a fetched member, unless it was changed since `start_fill` was called"""
+        assert self._changed is not None
+        if member.id not in self._changed:
+            self.update(member)
+
+    def end_fill(self) -> None:
+        self._changed = None
+
+    def clear(self) -> None:
+        self._role.clear()
+        self._timeouts.clear()
+        self._heap.clear()
+
+    def update(self, member: disnake.Member) -> None:
+        """Updates the state of the given member, e.g. after a member update event"""
+        self.set_role(member.id, bool(self._role_id and member.get_role(self._role_id)))
+        self.set_timeout(member.id, member.current_timeout)
+
+    def set_role(self, member_id: int, muted: bool) -> None:
+        self._mark_changed(member_id)
+        if muted:
+            self._role.add(member_id)
+        else:
+            self._role.discard(member_id)
+
+    def set_timeout(self, member_id: int, until: Optional[datetime]) -> None:
+        self._mark_changed(member_id)
+        if until is None or until <= disnake.utils.utcnow():
+            self._timeouts.pop(member_id, None)
+            return
+        if self._timeouts.get(member_id) == until:
+            return
+        self._timeouts[member_id] = until
+        heapq.heappush(self._heap, (until, member_id))
+
+    def remove(self, member_id: int) -> None:
+        self._mark_changed(member_id)
+        self._role.discard(member_id)
+        self._timeouts.pop(member_id, None)
+
+    def _mark_changed(self, member_id: int) -> None:
+        if self._changed is not None:
+            self._changed.add(member_id)
+
+    def _prune(self) -> None:
+        now = disnake.utils.utcnow()
+        while self._heap and self._heap[0][0] <= now:
+            expiry, member_id = heapq.heappop(self._heap)
+            # the timeout may have been changed or removed in the meantime
+            if self._timeouts.get(member_id) == expiry:
+                del self._timeouts[member_id]
+
+        # drop outdated entries once they make up most of the heap
+        if len(self._heap) > 2 * len(self._timeouts) + 16:
+            self._heap = [(e, m) for m, e in self._timeouts.items()]
+            heapq.heapify(self._heap)
+
+    def muted(self) -> Dict[int, Optional[datetime]]:
+        """Returns the IDs of all muted members, with the timeout expiry (None if muted by role)"""
+        self._prune()
+        result: Dict[int, Optional[datetime]] = {m: None for m in self._role}
+        for member_id, expiry in self._timeouts.items():
+            result.setdefault(member_id, expiry)
+        return result
+
+    def is_muted(self, member_id: int) -> bool:
+        if member_id in self._role:
+            return True
+        expiry = self._timeouts.get(member_id)
+        return expiry is not None and expiry > disnake.utils.utcnow()
+
+    def __len__(self) -> int:
+        self._prune()
+        return len(self._role | self._timeouts.keys())
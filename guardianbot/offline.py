@@ -0,0 +1,239 @@
+"""
+Utilities for running the filter pipeline without a connection to Discord,
+used by the benchmark suite and the replay tool.
+
+`configure` must be called before importing anything that depends on `Config`.
+"""
+
+import asyncio
+import hashlib
+import itertools
+import os
+import socket
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+import disnake
+from disnake.ext import commands
+
+if TYPE_CHECKING:
+    from .cogs.filter import FilterCog
+    from .filter import CheckContext, CheckResult
+
+# arbitrary IDs, only used if not provided in the environment
+_DEFAULT_GUILD_ID = 100000000000000000
+_BOT_USER_ID = 100000000000000001
+
+_BlockCallback = Callable[["CheckContext", str, "CheckResult"], None]
+
+
+def configure(data_dir: str, **env: str) -> None:
+    """Sets up the environment for the config, using placeholders for the Discord-specific values"""
+    os.environ["DISCORD_DATA_DIR"] = data_dir
+    os.environ.setdefault("DISCORD_DEBUG", "0")
+    os.environ.setdefault("DISCORD_TOKEN", "offline")
+    os.environ.setdefault("DISCORD_PREFIX", "?")
+    os.environ.setdefault("DISCORD_GUILD_ID", str(_DEFAULT_GUILD_ID))
+    # slow messages are reported by the tools themselves
+    os.environ.setdefault("DISCORD_SLOW_MESSAGE_MS", "0")
+    for key, value in env.items():
+        os.environ[f"DISCORD_{key.upper()}"] = value
+
+
+@dataclass(frozen=True)
+class _Addresses:
+    addresses: List[str]
+
+
+class StubResolver:
+    """
+    Stand-in for `aiodns.DNSResolver`, which deterministically maps hostnames to
+    (fake) IPv4 addresses, optionally with a simulated lookup latency.
+    """
+
+    def __init__(self, latency: float = 0, overrides: Optional[Dict[str, List[str]]] = None):
+        self.latency = latency
+        self.overrides = overrides or {}
+        self.lookups = 0
+
+    async def gethostbyname(self, host: str, family: socket.AddressFamily) -> _Addresses:
+        assert family == socket.AF_INET
+        self.lookups += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if (addrs := self.overrides.get(host.lower())) is not None:
+            return _Addresses(addrs)
+        return _Addresses([self.address(host)])
+
+    @staticmethod
+    def address(host: str) -> str:
+        digest = hashlib.sha256(host.lower().encode()).digest()
+        # keep stub results out of well-known ranges, in 10.0.0.0/8
+        return f"10.{digest[0]}.{digest[1]}.{digest[2]}"
+
+
+class OfflineGuild:
+    """
+    A bot and guild that exist purely in the local cache, for building real
+    `disnake.Message` objects from (partial) API payloads.
+    """
+
+    def __init__(self, guild_id: int, *, prefix: str = "?"):
+        self.bot = commands.Bot(command_prefix=prefix, intents=disnake.Intents.all())
+        state = self.bot._connection
+        state.user = disnake.ClientUser(
+            state=state,
+            data={
+                "id": str(_BOT_USER_ID),
+                "username": "GuardianBot",
+                "discriminator": "0",
+                "avatar": None,
+            },
+        )
+        self.guild = disnake.Guild(
+            state=state,
+            data={
+                "id": str(guild_id),
+                "name": "offline",
+                "roles": [self._role_payload(guild_id, "@everyone")],
+                "channels": [],
+                "members": [],
+                "member_count": 0,
+            },  # type: ignore
+        )
+        state._add_guild(self.guild)
+
+        self._message_ids = itertools.count(1)
+
+    @staticmethod
+    def _role_payload(role_id: int, name: str) -> Dict[str, Any]:
+        return {
+            "id": str(role_id),
+            "name": name,
+            "permissions": "0",
+            "position": 0,
+            # the role color format differs between disnake versions, provide both
+            "color": 0,
+            "colors": {"primary_color": 0, "secondary_color": None, "tertiary_color": None},
+            "hoist": False,
+            "managed": False,
+            "mentionable": False,
+        }
+
+    def _ensure_role(self, role_id: int) -> None:
+        if self.guild.get_role(role_id) is None:
+            payload = self._role_payload(role_id, f"role-{role_id}")
+            self.guild._add_role(
+                disnake.Role(guild=self.guild, state=self.bot._connection, data=payload)  # type: ignore
+            )
+
+    def get_channel(self, channel_id: int) -> disnake.TextChannel:
+        """Returns the text channel with the given ID, creating it if necessary"""
+        channel = self.guild.get_channel(channel_id)
+        if channel is None:
+            channel = disnake.TextChannel(
+                state=self.bot._connection,
+                guild=self.guild,
+                data={
+                    "id": str(channel_id),
+                    "type": 0,
+                    "name": f"channel-{channel_id}",
+                    "position": 0,
+                    "guild_id": str(self.guild.id),
+                    "permission_overwrites": [],
+                },  # type: ignore
+            )
+            self.guild._add_channel(channel)
+        assert isinstance(channel, disnake.TextChannel)
+        return channel
+
+    def message(self, data: Dict[str, Any]) -> disnake.Message:
+        """
+        Creates a message from an API message payload, filling in missing fields.
+
+        If `id` is missing, an ID is derived from `timestamp` (or the current time).
+        """
+        data = dict(data)
+        if "id" not in data:
+            created = (
+                datetime.fromisoformat(data["timestamp"])
+                if "timestamp" in data
+                else datetime.now(timezone.utc)
+            )
+            # keep IDs unique, even for messages with the same timestamp
+            data["id"] = str(
+                disnake.utils.time_snowflake(created) + next(self._message_ids) % (1 << 22)
+            )
+        message_id = int(data["id"])
+        created_at = disnake.utils.snowflake_time(message_id).isoformat()
+
+        author: Dict[str, Any] = {
+            "id": "1",
+            "username": "user",
+            "discriminator": "0",
+            "avatar": None,
+            **data.get("author", {}),
+        }
+        member: Dict[str, Any] = {
+            "roles": [],
+            "joined_at": created_at,
+            "deaf": False,
+            "mute": False,
+            **data.get("member", {}),
+        }
+        data.update(
+            author=author,
+            member=member,
+            guild_id=str(self.guild.id),
+        )
+        for role_id in member["roles"]:
+            self._ensure_role(int(role_id))
+        data.setdefault("channel_id", "1")
+        data.setdefault("type", 0)
+        data.setdefault("content", "")
+        data.setdefault("timestamp", created_at)
+        data.setdefault("edited_timestamp", None)
+        for key in ("attachments", "embeds", "mentions", "mention_roles"):
+            data.setdefault(key, [])
+        for key in ("pinned", "mention_everyone", "tts"):
+            data.setdefault(key, False)
+
+        channel = self.get_channel(int(data["channel_id"]))
+        return disnake.Message(state=self.bot._connection, channel=channel, data=data)  # type: ignore
+
+
+class BlockRecorder:
+    """Replaces `FilterCog._handle_blocked`, recording would-be blocks instead of taking action"""
+
+    def __init__(self, callback: Optional[_BlockCallback] = None):
+        self.blocks: Dict[str, int] = {}
+        self._callback = callback
+
+    async def __call__(self, context: "CheckContext", checker_name: str, result: "CheckResult"):
+        self.blocks[checker_name] = self.blocks.get(checker_name, 0) + 1
+        if self._callback:
+            self._callback(context, checker_name, result)
+
+
+def load_filter_cog(
+    guild: OfflineGuild,
+    *,
+    resolver: Optional[StubResolver] = None,
+    on_block: Optional[_BlockCallback] = None,
+) -> Tuple["FilterCog", BlockRecorder]:
+    """
+    Creates a filter cog using the lists from the configured data directory,
+    which records blocks instead of muting users/deleting messages.
+    The cog isn't added to the bot, i.e. no listeners or background tasks are started.
+    """
+    from .cogs.filter import FilterCog
+    from .filter import IPChecker
+
+    cog = FilterCog(guild.bot)
+    recorder = BlockRecorder(on_block)
+    cog._handle_blocked = recorder  # type: ignore
+    if resolver is not None:
+        for checker in cog.get_checkers(IPChecker).values():
+            checker._resolver = resolver  # type: ignore
+    return cog, recorder
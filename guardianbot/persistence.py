@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Callable, Generic, Optional, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+_T = TypeVar("_T")
+
+# delay between the first change and the actual write; any changes made
+# in the meantime get coalesced into the same write
+WRITE_DELAY = 1.0
+
+# `os.umask` can only be read by setting it, do this once on startup instead of on every write
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def _file_mode(path: Path) -> int:
+    """Returns the mode of the existing file, or the default mode for new files"""
+    try:
+        return path.stat().st_mode & 0o7777
+    except FileNotFoundError:
+        return 0o666 & ~_UMASK
+
+
+def write_atomic(path: Path, data: str) -> None:
+    """
+    Writes data to a temporary file in the same directory, then replaces the target file,
+    which ensures that the target is never left partially written.
+    Keeps the mode of the existing file, since `mkstemp` always creates files with mode 0600.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    mode = _file_mode(path)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        if hasattr(os, "fchmod"):  # not available on windows
+            os.fchmod(fd, mode)
+        with os.fdopen(fd, "w") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class DebouncedWriter(Generic[_T]):
+    """
+    Persists data in an executor, coalescing bursts of changes into a single write.
+
+    `snapshot` is called on the event loop right before writing (so it sees a consistent state),
+    `write` is called with the snapshot in the executor, and does the actual (blocking) I/O.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        snapshot: Callable[[], _T],
+        write: Callable[[_T], None],
+        *,
+        delay: float = WRITE_DELAY,
+    ):
+        self.name = name
+        self._snapshot = snapshot
+        self._write_func = write
+        self._delay = delay
+
+        self._dirty = False
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._task: Optional["asyncio.Task[None]"] = None
+
+        # writes may happen concurrently from the executor and `flush_sync`,
+        # make sure an older snapshot never replaces a newer one
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._written_seq = 0
+
+    @property
+    def pending(self) -> bool:
+        """Whether there are changes that haven't been written yet"""
+        return self._dirty or (self._task is not None and not self._task.done())
+
+    def schedule(self) -> None:
+        """Marks data as changed; writes immediately if no event loop is running"""
+        self._dirty = True
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush_sync()
+            return
+
+        if self._handle is None and (self._task is None or self._task.done()):
+            self._handle = loop.call_later(self._delay, self._start_write)
+
+    def _start_write(self) -> None:
+        self._handle = None
+        self._task = asyncio.get_running_loop().create_task(self._write())
+
+    async def _write(self) -> None:
+        while self._dirty:
+            self._dirty = False
+            seq, data = self._take_snapshot()
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, self._write_sync, seq, data)
+            except Exception:
+                logger.exception(f"failed writing {self.name}")
+
+    def _take_snapshot(self) -> Tuple[int, _T]:
+        self._seq += 1
+        return self._seq, self._snapshot()
+
+    def _write_sync(self, seq: int, data: _T) -> None:
+        with self._lock:
+            if seq < self._written_seq:
+                return  # a newer snapshot was already written
+            self._write_func(data)
+            self._written_seq = seq
+
+    async def flush(self) -> None:
+        """Writes any pending changes immediately, and waits for in-progress writes"""
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        if self._task is not None and not self._task.done():
+            await self._task
+        if self._dirty:
+            self._task = asyncio.get_running_loop().create_task(self._write())
+            await self._task
+
+    def flush_sync(self) -> None:
+        """Writes any pending changes immediately, blocking the current thread (used on shutdown)"""
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        if not self._dirty:
+            return
+        self._dirty = False
+        self._write_sync(*self._take_snapshot())
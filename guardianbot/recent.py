@@ -0,0 +1,50 @@
+import collections
+from datetime import datetime
+from typing import Deque, Dict, List, Tuple
+
+import disnake
+
+
+class RecentMessages:
+    """
+    Index of the most recent messages of each author, as (channel ID, message ID) pairs.
+
+    Keeps at most `per_author` messages for each of the `max_authors` most recently active authors;
+    the least recently active authors are evicted first.
+    """
+
+    def __init__(self, *, per_author: int = 100, max_authors: int = 10000):
+        self._per_author = per_author
+        self._max_authors = max_authors
+        self._authors: "collections.OrderedDict[int, Deque[Tuple[int, int]]]" = (
+            collections.OrderedDict()
+        )
+
+    def add(self, author_id: int, channel_id: int, message_id: int) -> None:
+        if (messages := self._authors.get(author_id)) is None:
+            messages = self._authors[author_id] = collections.deque(maxlen=self._per_author)
+            if len(self._authors) > self._max_authors:
+                self._authors.popitem(last=False)
+        else:
+            self._authors.move_to_end(author_id)
+        messages.append((channel_id, message_id))
+
+    def get(self, author_id: int, since: datetime) -> Dict[int, List[int]]:
+        """Returns the IDs of the author's messages since the given time, grouped by channel ID"""
+        min_id = disnake.utils.time_snowflake(since)
+        result: Dict[int, List[int]] = collections.defaultdict(list)
+        for channel_id, message_id in self._authors.get(author_id, ()):
+            if message_id >= min_id:
+                result[channel_id].append(message_id)
+        return dict(result)
+
+    def discard(self, author_id: int, message_ids: List[int]) -> None:
+        if (messages := self._authors.get(author_id)) is None:
+            return
+        ids = set(message_ids)
+        remaining = [m for m in messages if m[1] not in ids]
+        messages.clear()
+        messages.extend(remaining)
+
+    def __len__(self) -> int:
+        return len(self._authors)
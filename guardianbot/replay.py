@@ -0,0 +1,143 @@
+"""
+Replays an export of messages through the filter pipeline, without connecting to Discord.
+
+The export is a JSONL file with one Discord API message object per line (at least `content`;
+`id`/`timestamp`, `author`, `member`, `channel_id`, `embeds` and `message_snapshots` are used
+if present). Messages are processed one at a time, in order.
+
+Usage: python -m guardianbot.replay <export.jsonl> [--data-dir DIR] [--stub-dns] [--show-blocks]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, TextIO, Tuple
+
+from . import offline
+
+if TYPE_CHECKING:
+    from .filter import CheckContext, CheckResult
+
+logger = logging.getLogger("guardianbot.replay")
+
+# print progress every n messages
+PROGRESS_INTERVAL = 10000
+
+
+def _read_lines(f: TextIO) -> Iterator[Tuple[int, Dict[str, object]]]:
+    for lineno, line in enumerate(f, 1):
+        if not (line := line.strip()):
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError as e:
+            logger.warning(f"skipping invalid line {lineno}: {e}")
+            continue
+        if not isinstance(data, dict):
+            logger.warning(f"skipping line {lineno}: expected an object")
+            continue
+        yield lineno, data
+
+
+def _print_block(context: "CheckContext", checker_name: str, result: "CheckResult") -> None:
+    content = context.string.replace("\n", " ")
+    if len(content) > 100:
+        content = content[:97] + "..."
+    print(
+        f"[{checker_name}] {context.message.id} by {context.author.id}: {result.reason}\n"
+        f"    {content}"
+    )
+
+
+async def replay(f: TextIO, *, stub_dns: bool, show_blocks: bool) -> None:
+    from .cogs import filter as filter_cog
+    from .config import Config
+
+    guild = offline.OfflineGuild(Config.guild_id, prefix=Config.prefix)
+    cog, recorder = offline.load_filter_cog(
+        guild,
+        resolver=offline.StubResolver() if stub_dns else None,
+        on_block=_print_block if show_blocks else None,
+    )
+    logger.info(f"loaded lists: { {n: len(c) for n, c in cog.checkers.items()} }")
+
+    total = errors = 0
+    start = time.perf_counter()
+    for lineno, data in _read_lines(f):
+        try:
+            message = guild.message(data)
+        except Exception as e:
+            logger.warning(f"skipping line {lineno}, couldn't create message: {e!r}")
+            errors += 1
+            continue
+
+        await cog._on_message(message)
+        total += 1
+        if total % PROGRESS_INTERVAL == 0:
+            elapsed = time.perf_counter() - start
+            print(f"{total} messages, {total / elapsed:.0f} msg/s", file=sys.stderr)
+    elapsed = time.perf_counter() - start
+
+    ignored = {
+        labels["reason"]: int(count)
+        for labels, count in filter_cog.messages_total.items()
+        if labels["result"] == "ignored"
+    }
+    print(f"\nprocessed {total} messages in {elapsed:.2f}s ({total / (elapsed or 1):.0f} msg/s)")
+    if errors:
+        print(f"skipped {errors} invalid messages")
+    print(f"checked: {total - sum(ignored.values())}")
+    for reason, count in sorted(ignored.items(), key=lambda x: -x[1]):
+        print(f"ignored ({reason}): {count}")
+    print("would-be blocks:")
+    for name in cog.checkers:
+        if cog.checkers[name] is not cog.allowlist:
+            print(f"    {name}: {recorder.blocks.get(name, 0)}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m guardianbot.replay", description=__doc__.strip().splitlines()[0]
+    )
+    parser.add_argument("export", help="JSONL file with one message per line, or - for stdin")
+    parser.add_argument(
+        "--data-dir",
+        default=os.environ.get("DISCORD_DATA_DIR"),
+        help="data directory to load lists/state from (default: $DISCORD_DATA_DIR)",
+    )
+    parser.add_argument(
+        "--stub-dns", action="store_true", help="resolve hosts using a stub resolver"
+    )
+    parser.add_argument("--show-blocks", action="store_true", help="print every would-be block")
+    parser.add_argument("-v", "--verbose", action="store_true", help="enable info logging")
+    args = parser.parse_args(argv)
+    if not args.data_dir:
+        parser.error("no data directory given")
+
+    logging.basicConfig(
+        format="%(asctime)s: [%(levelname)s] %(name)s: %(message)s",
+        level=logging.INFO if args.verbose else logging.WARNING,
+    )
+
+    with tempfile.TemporaryDirectory(prefix="guardianbot-replay-") as tmp:
+        # work on a copy, since hit counts/state may be written while replaying
+        data_dir = Path(tmp) / "data"
+        shutil.copytree(args.data_dir, data_dir)
+        offline.configure(str(data_dir))
+
+        if args.export == "-":
+            asyncio.run(replay(sys.stdin, stub_dns=args.stub_dns, show_blocks=args.show_blocks))
+        else:
+            with open(args.export, "r", encoding="utf-8") as f:
+                asyncio.run(replay(f, stub_dns=args.stub_dns, show_blocks=args.show_blocks))
+
+
+if __name__ == "__main__":
+    main()
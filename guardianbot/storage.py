@@ -0,0 +1,260 @@
+import json
+import logging
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from . import persistence
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class BlockEvent:
+    timestamp: datetime
+    user_id: int
+    channel_id: int
+    message_id: int
+    # name of the checker/list that matched
+    checker: str
+    # matched list entry, if applicable
+    entry: Optional[str]
+    reason: str
+    content: str
+    is_forwarded: bool
+
+
+class Storage:
+    """
+    Base storage backend for filter lists, cog state and the block audit log.
+
+    All methods are blocking, and should be run in an executor if called from the event loop
+    (except for during startup).
+    """
+
+    def load_list(self, name: str) -> Optional[List[str]]:
+        raise NotImplementedError
+
+    def save_list(self, name: str, entries: List[str]) -> None:
+        raise NotImplementedError
+
+    def load_state(self, name: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def save_state(self, name: str, data: str) -> None:
+        raise NotImplementedError
+
+    def record_block(self, event: BlockEvent) -> None:
+        pass
+
+    @property
+    def supports_audit(self) -> bool:
+        return False
+
+    def close(self) -> None:
+        pass
+
+
+class JsonStorage(Storage):
+    """Stores lists and state as plain JSON files in the data directory; blocks are only logged"""
+
+    def __init__(self, data_dir: str):
+        self._data_dir = Path(data_dir)
+
+    def list_path(self, name: str) -> Path:
+        return self._data_dir / name
+
+    def state_path(self, name: str) -> Path:
+        return self._data_dir / "state" / f"{name}.json"
+
+    def load_list(self, name: str) -> Optional[List[str]]:
+        path = self.list_path(name)
+        if not path.is_file():
+            return None
+        with path.open("r") as f:
+            return json.load(f)
+
+    def save_list(self, name: str, entries: List[str]) -> None:
+        persistence.write_atomic(self.list_path(name), json.dumps(entries, indent=4))
+
+    def load_state(self, name: str) -> Optional[str]:
+        path = self.state_path(name)
+        if not path.is_file():
+            return None
+        return path.read_text()
+
+    def save_state(self, name: str, data: str) -> None:
+        persistence.write_atomic(self.state_path(name), data)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS lists (
+    name TEXT PRIMARY KEY
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS list_entries (
+    list TEXT NOT NULL,
+    entry TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (list, entry)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS list_entries_position ON list_entries (list, position);
+
+CREATE TABLE IF NOT EXISTS state (
+    name TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS blocks (
+    id INTEGER PRIMARY KEY,
+    timestamp INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    channel_id INTEGER NOT NULL,
+    message_id INTEGER NOT NULL,
+    checker TEXT NOT NULL,
+    entry TEXT,
+    reason TEXT NOT NULL,
+    content TEXT NOT NULL,
+    is_forwarded INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS blocks_user ON blocks (user_id, timestamp);
+CREATE INDEX IF NOT EXISTS blocks_entry ON blocks (checker, entry, timestamp);
+CREATE INDEX IF NOT EXISTS blocks_timestamp ON blocks (timestamp);
+"""
+
+
+class SqliteStorage(Storage):
+    """
+    Stores lists, state and an audit log of blocks in a single SQLite database (in WAL mode).
+
+    Lists and state that don't exist in the database yet are imported
+    from the JSON files of `JsonStorage` on first access.
+    """
+
+    def __init__(self, path: str, fallback: Optional[JsonStorage] = None):
+        self._fallback = fallback
+        # the connection is shared between the event loop thread (startup) and executor threads,
+        # access is serialized using the lock
+        self._lock = threading.Lock()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+
+    def load_list(self, name: str) -> Optional[List[str]]:
+        with self._lock:
+            exists = self._conn.execute("SELECT 1 FROM lists WHERE name = ?", (name,)).fetchone()
+            if exists:
+                rows = self._conn.execute(
+                    "SELECT entry FROM list_entries WHERE list = ? ORDER BY position", (name,)
+                ).fetchall()
+                return [r[0] for r in rows]
+
+        if self._fallback and (entries := self._fallback.load_list(name)) is not None:
+            logger.info(f"importing {len(entries)} entries for list '{name}' from JSON")
+            self.save_list(name, entries)
+            return entries
+        return None
+
+    def save_list(self, name: str, entries: List[str]) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.execute("INSERT OR IGNORE INTO lists (name) VALUES (?)", (name,))
+            self._conn.execute("DELETE FROM list_entries WHERE list = ?", (name,))
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO list_entries (list, entry, position) VALUES (?, ?, ?)",
+                ((name, entry, i) for i, entry in enumerate(entries)),
+            )
+
+    def load_state(self, name: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM state WHERE name = ?", (name,)).fetchone()
+        if row:
+            return row[0]
+
+        if self._fallback and (data := self._fallback.load_state(name)) is not None:
+            logger.info(f"importing state '{name}' from JSON")
+            self.save_state(name, data)
+            return data
+        return None
+
+    def save_state(self, name: str, data: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO state (name, data) VALUES (?, ?)"
+                " ON CONFLICT (name) DO UPDATE SET data = excluded.data",
+                (name, data),
+            )
+
+    @property
+    def supports_audit(self) -> bool:
+        return True
+
+    def record_block(self, event: BlockEvent) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO blocks"
+                " (timestamp, user_id, channel_id, message_id, checker, entry, reason, content, is_forwarded)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    int(event.timestamp.timestamp()),
+                    event.user_id,
+                    event.channel_id,
+                    event.message_id,
+                    event.checker,
+                    event.entry,
+                    event.reason,
+                    event.content,
+                    event.is_forwarded,
+                ),
+            )
+
+    def blocks_for_user(self, user_id: int, limit: int = 25) -> List[BlockEvent]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT timestamp, user_id, channel_id, message_id, checker, entry, reason, content, is_forwarded"
+                " FROM blocks WHERE user_id = ? ORDER BY timestamp DESC LIMIT ?",
+                (user_id, limit),
+            ).fetchall()
+        return [
+            BlockEvent(datetime.fromtimestamp(ts, timezone.utc), *rest[:-1], bool(rest[-1]))
+            for ts, *rest in rows
+        ]
+
+    def hits_per_entry(self, since: datetime) -> List[Tuple[str, Optional[str], int]]:
+        """Returns (checker, entry, count) tuples for all blocks since the given time"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT checker, entry, COUNT(*) AS n FROM blocks WHERE timestamp >= ?"
+                " GROUP BY checker, entry ORDER BY n DESC",
+                (int(since.timestamp()),),
+            ).fetchall()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_storage: Optional[Storage] = None
+
+
+def get() -> Storage:
+    """Returns the storage backend selected in the config"""
+    global _storage
+    if _storage is None:
+        json_storage = JsonStorage(Config.data_dir)
+        if Config.storage == "json":
+            _storage = json_storage
+        elif Config.storage == "sqlite":
+            _storage = SqliteStorage(
+                str(Path(Config.data_dir) / "guardianbot.db"), fallback=json_storage
+            )
+        else:
+            raise ValueError(f"Invalid storage backend: '{Config.storage}'")
+    return _storage
@@ -0,0 +1,96 @@
+import contextlib
+import contextvars
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Protocol
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Span:
+    name: str
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    start: float = field(default_factory=time.perf_counter)
+    end: Optional[float] = None
+    children: List["Span"] = field(default_factory=list)
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def format(self, indent: int = 0) -> str:
+        """Returns a human-readable breakdown of this span and all of its children"""
+        attrs = " ".join(f"{k}={v}" for k, v in self.attributes.items())
+        lines = [f"{'  ' * indent}{self.name}: {self.duration * 1000:.1f}ms {attrs}".rstrip()]
+        lines.extend(c.format(indent + 1) for c in sorted(self.children, key=lambda c: c.start))
+        return "\n".join(lines)
+
+
+class SpanExporter(Protocol):
+    def export(self, span: Span) -> None:
+        """Called with each finished root span (including all of its children)"""
+        ...
+
+
+class LoggingExporter:
+    """Logs every root span at the debug level"""
+
+    def export(self, span: Span) -> None:
+        logger.debug(f"trace:\n{span.format()}")
+
+
+class SlowSpanExporter:
+    """Logs the full breakdown of root spans that took longer than the given threshold"""
+
+    def __init__(self, threshold_ms: int):
+        self.threshold = threshold_ms / 1000
+
+    def export(self, span: Span) -> None:
+        if span.duration >= self.threshold:
+            logger.warning(f"slow {span.name} ({span.duration * 1000:.1f}ms):\n{span.format()}")
+
+
+_exporters: List[SpanExporter] = []
+_current_span: "contextvars.ContextVar[Optional[Span]]" = contextvars.ContextVar(
+    "current_span", default=None
+)
+
+
+def add_exporter(exporter: SpanExporter) -> None:
+    _exporters.append(exporter)
+
+
+@contextlib.contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """
+    Creates a new span as a child of the current span (or as a new root span).
+
+    Tasks inherit the current span, i.e. spans created in tasks
+    started from within a span are children of that span.
+    """
+    parent = _current_span.get()
+    s = Span(name, attributes)
+    if parent is not None:
+        parent.children.append(s)
+
+    token = _current_span.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.set(error=type(e).__name__)
+        raise
+    finally:
+        s.end = time.perf_counter()
+        _current_span.reset(token)
+
+        if parent is None:
+            for exporter in _exporters:
+                try:
+                    exporter.export(s)
+                except Exception:
+                    logger.exception(f"failed exporting span using {exporter}")
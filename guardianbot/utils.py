@@ -31,6 +31,10 @@ async def wait_timeout(aw: Awaitable[_T], timeout: float, fallback: _U) -> Union
         return fallback
 
 
+async def run_in_executor(func: Callable[..., _T], *args: Any) -> _T:
+    return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+
 def extract_hosts(input: str) -> List[str]:
     return re.findall(r"https?://([^/?#<>\s]+)", input)
 
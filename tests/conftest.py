@@ -0,0 +1,19 @@
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from guardianbot import offline
+
+# the config is read on import, so this has to happen before any other module is imported
+_DATA_DIR = Path(tempfile.mkdtemp(prefix="guardianbot-tests-"))
+offline.configure(str(_DATA_DIR), storage="json")
+
+
+@pytest.fixture
+def data_dir() -> Iterator[Path]:
+    _DATA_DIR.mkdir(exist_ok=True)
+    yield _DATA_DIR
+    shutil.rmtree(_DATA_DIR)
@@ -0,0 +1,128 @@
+import asyncio
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import aiohttp
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from guardianbot.filter import DiscordBadDomainsChecker
+
+
+class ListServer:
+    """Local stand-in for the list endpoint, with ETag support"""
+
+    def __init__(self, entries: List[str], *, etag: bool = True):
+        self.entries = entries
+        self.etag = etag
+        self.requests: List[Dict[str, str]] = []
+        self.etag_value: Optional[str] = None
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.requests.append(dict(request.headers))
+        body = json.dumps(self.entries).encode()
+        if not self.etag:
+            return web.Response(body=body)
+        etag = self.etag_value = f'"{hashlib.md5(body).hexdigest()}"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304)
+        return web.Response(body=body, headers={"ETag": etag})
+
+
+def run(
+    server: ListServer,
+    func: Callable[[DiscordBadDomainsChecker, Callable[[], Awaitable[None]]], Any],
+) -> Any:
+    async def main() -> Any:
+        app = web.Application()
+        app.router.add_get("/list.json", server.handle)
+        async with TestServer(app) as srv, aiohttp.ClientSession() as session:
+            checker = DiscordBadDomainsChecker()
+            checker._url = str(srv.make_url("/list.json"))
+            result = await func(checker, lambda: checker.update(session))
+            await checker._writer.flush()
+            return result
+
+    return asyncio.run(main())
+
+
+def _update_logs(caplog: pytest.LogCaptureFixture) -> List[str]:
+    return [r.getMessage() for r in caplog.records if r.getMessage().startswith("updated ")]
+
+
+def test_update(data_dir: Path, caplog: pytest.LogCaptureFixture) -> None:
+    server = ListServer(["AAAA", "bbbb"])
+
+    async def func(checker: DiscordBadDomainsChecker, update: Callable[[], Awaitable[None]]):
+        await update()
+        return sorted(checker)
+
+    with caplog.at_level("INFO"):
+        assert run(server, func) == ["aaaa", "bbbb"]
+    assert [m.split(": ")[-1] for m in _update_logs(caplog)] == ["2 added, 0 removed"]
+    assert json.loads((data_dir / "discord_bad_domains.cache").read_text()) == ["aaaa", "bbbb"]
+
+
+def test_not_modified(data_dir: Path, caplog: pytest.LogCaptureFixture) -> None:
+    server = ListServer(["aaaa"])
+
+    async def func(checker: DiscordBadDomainsChecker, update: Callable[[], Awaitable[None]]):
+        await update()
+        await update()
+
+    with caplog.at_level("DEBUG"):
+        run(server, func)
+    assert "If-None-Match" not in server.requests[0]
+    assert server.requests[1]["If-None-Match"] == server.etag_value
+    assert any(r.getMessage().endswith(": not modified") for r in caplog.records)
+    assert len(_update_logs(caplog)) == 1
+
+
+def test_etag_persisted(data_dir: Path) -> None:
+    server = ListServer(["aaaa"])
+
+    async def first(checker: DiscordBadDomainsChecker, update: Callable[[], Awaitable[None]]):
+        await update()
+
+    async def second(checker: DiscordBadDomainsChecker, update: Callable[[], Awaitable[None]]):
+        # new instance, validators are loaded from the stored state
+        await update()
+        return list(checker)
+
+    run(server, first)
+    assert run(server, second) == ["aaaa"]
+    assert server.requests[1]["If-None-Match"] == server.etag_value
+
+
+def test_content_unchanged(data_dir: Path, caplog: pytest.LogCaptureFixture) -> None:
+    # no validators, the response body is the same
+    server = ListServer(["aaaa"], etag=False)
+
+    async def func(checker: DiscordBadDomainsChecker, update: Callable[[], Awaitable[None]]):
+        await update()
+        await update()
+
+    with caplog.at_level("DEBUG"):
+        run(server, func)
+    assert "If-None-Match" not in server.requests[1]
+    assert any(r.getMessage().endswith(": content unchanged") for r in caplog.records)
+    assert len(_update_logs(caplog)) == 1
+
+
+def test_added_removed(data_dir: Path, caplog: pytest.LogCaptureFixture) -> None:
+    server = ListServer(["aaaa", "bbbb", "cccc"])
+
+    async def func(checker: DiscordBadDomainsChecker, update: Callable[[], Awaitable[None]]):
+        await update()
+        server.entries = ["bbbb", "dddd", "eeee", "ffff"]
+        await update()
+        return sorted(checker), "aaaa" in checker, "ffff" in checker
+
+    with caplog.at_level("INFO"):
+        entries, has_removed, has_added = run(server, func)
+    assert entries == ["bbbb", "dddd", "eeee", "ffff"]
+    assert not has_removed and has_added
+    assert _update_logs(caplog)[-1].endswith(": 3 added, 2 removed")